@@ -1,16 +1,66 @@
 import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
 
 from app.schemas.csv import CsvAnalysisRequest, CsvParseResponse, CsvSaveRequest
+from app.schemas.history import (
+    BulkDeleteRequest,
+    CsvBulkUpdateRequest,
+    ReceiptBulkUpdateRequest,
+)
 from app.schemas.memo import MemoRowUpsertRequest
-from app.schemas.receipt import ReceiptData, SearchQuery
+from app.schemas.receipt import ReceiptSaveRequest, SearchQuery
+from app.services.admission_service import (
+    ANSWER_RESPONSE_TOKEN_ESTIMATE,
+    CSV_MAPPING_RESPONSE_TOKEN_ESTIMATE,
+    IMAGE_TOKEN_ESTIMATE,
+    ITEM_LABEL_TOKEN_ESTIMATE,
+    LEAN_RECEIPT_RESPONSE_TOKEN_ESTIMATE,
+    RECEIPT_RESPONSE_TOKEN_ESTIMATE,
+    AdmissionRejected,
+    AdmissionService,
+    estimate_text_tokens,
+)
+from app.services.chat_session_service import (
+    MIN_CACHE_TOKENS,
+    ChatSessionService,
+)
 from app.services.csv_service import CsvService
+from app.services.duplicate_service import DuplicateService, compute_image_hashes
+from app.services.export_service import ExportService
 from app.services.gemini_service import GeminiService
+from app.services.item_classifier_service import (
+    ExtractionStats,
+    ItemClassifierService,
+)
+from app.services.price_history_service import PriceHistoryService
 from app.services.supabase_service import SupabaseService
+from app.services.sync_service import SyncService
+from app.utils.compression import CompressionMiddleware
+from app.utils.profiling import (
+    ProfileStore,
+    ProfilingMiddleware,
+    is_admin_token,
+    profile_phase,
+)
+from app.utils.responses import FastJSONResponse
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, File, Header, HTTPException, UploadFile
+from fastapi import (
+    Depends,
+    FastAPI,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,12 +68,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
 load_dotenv()
 
+profile_store = ProfileStore(
+    Path(
+        os.environ.get(
+            "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "receipt-profiles")
+        )
+    ),
+    max_profiles=int(os.environ.get("PROFILE_MAX_FILES", "50")),
+)
+# 最も外側に置き、圧縮も含めたリクエスト全体を計測する
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", "0")),
+    interval=float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000,
+)
+
 gemini_service = GeminiService()
 csv_service = CsvService()
+export_service = ExportService()
+price_history_service = PriceHistoryService()
+duplicate_service = DuplicateService()
+item_classifier_service = ItemClassifierService()
+extraction_stats = ExtractionStats()
+sync_service = SyncService()
+chat_session_service = ChatSessionService(gemini_service.delete_answer_cache)
+
+DEFAULT_EXTRACTION_MODE = os.environ.get("RECEIPT_EXTRACTION_MODE", "full")
+admission_service = AdmissionService()
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/")
@@ -35,86 +123,365 @@ async def get_supabase_service(
     x_supabase_token: str = Header(..., alias="x-supabase-token"),
 ) -> SupabaseService:
     try:
-        return await asyncio.to_thread(SupabaseService, token=x_supabase_token)
+        with profile_phase("supabase_auth"):
+            return await asyncio.to_thread(SupabaseService, token=x_supabase_token)
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
 
+async def require_admin(
+    x_admin_token: str | None = Header(None, alias="x-admin-token"),
+) -> None:
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def record_receipt_change(
+    user_id: str,
+    receipt_id: str,
+    receipt: dict,
+    image_hashes: list[str] | None = None,
+) -> None:
+    items = receipt.get("receipt_items", [])
+    item_classifier_service.learn(user_id, items)
+    price_history_service.record_receipt(
+        user_id, receipt_id, receipt.get("date"), receipt.get("store_name"), items
+    )
+    duplicate_service.record_receipt(
+        user_id,
+        receipt_id,
+        receipt.get("date"),
+        receipt.get("store_name"),
+        receipt.get("total_amount"),
+        items,
+        image_hashes,
+    )
+    chat_session_service.invalidate_user(user_id)
+
+
+def remove_receipt_change(user_id: str, receipt_id: str) -> None:
+    price_history_service.remove_receipt(user_id, receipt_id)
+    duplicate_service.remove_receipt(user_id, receipt_id)
+    chat_session_service.invalidate_user(user_id)
+
+
+async def analyze_receipt_lean(
+    supabase_service: SupabaseService, image_bytes_list: list[bytes]
+) -> tuple[dict, dict]:
+    result, usage = await admission_service.run(
+        supabase_service.user_id,
+        "analyze",
+        IMAGE_TOKEN_ESTIMATE * len(image_bytes_list)
+        + LEAN_RECEIPT_RESPONSE_TOKEN_ESTIMATE,
+        gemini_service.analyze_receipt_lean_with_usage,
+        image_bytes_list,
+    )
+    metrics = {
+        "prompt_tokens": usage["prompt_tokens"],
+        "response_tokens": usage["response_tokens"],
+    }
+
+    uncertain = await asyncio.to_thread(
+        item_classifier_service.classify,
+        supabase_service,
+        result.get("receipts", []),
+    )
+
+    if uncertain:
+        # 分類器が判断できなかった品目だけをモデルに問い合わせる
+        item_names = sorted({item["item_name"] for item in uncertain})
+        try:
+            labels, label_usage = await admission_service.run(
+                supabase_service.user_id,
+                "analyze",
+                estimate_text_tokens("\n".join(item_names))
+                + ITEM_LABEL_TOKEN_ESTIMATE * len(item_names),
+                gemini_service.classify_items_with_usage,
+                item_names,
+            )
+        except AdmissionRejected:
+            # 抽出結果は取得済みなので捨てずに返し、ラベルは既定値にして編集画面で直してもらう
+            item_classifier_service.apply_model_labels(uncertain, [])
+            metrics["items_labeled_by_default"] = len(uncertain)
+        else:
+            item_classifier_service.apply_model_labels(
+                uncertain, labels.get("items", [])
+            )
+            metrics["prompt_tokens"] += label_usage["prompt_tokens"]
+            metrics["response_tokens"] += label_usage["response_tokens"]
+
+    metrics["items_classified_by_model"] = len(uncertain)
+    return result, metrics
+
+
 @app.post("/analyze")
 async def analyze_receipt(
     files: list[UploadFile] = File(...),
+    mode: str = Query(DEFAULT_EXTRACTION_MODE, pattern="^(full|lean)$"),
     supabase_service: SupabaseService = Depends(get_supabase_service),
 ):
     try:
         image_bytes_list = [await file.read() for file in files]
-        result = await asyncio.to_thread(
-            gemini_service.analyze_receipt, image_bytes_list
-        )
-
-        for receipt in result.get("receipts", []):
-            for item in receipt.get("items", []):
-                item["is_comparable"] = True
+        started_at = time.monotonic()
 
-        item_names = []
-        for receipt in result.get("receipts", []):
-            for item in receipt.get("items", []):
-                item_names.append(item["item_name"])
+        if mode == "lean":
+            with profile_phase("model_call"):
+                result, extraction = await analyze_receipt_lean(
+                    supabase_service, image_bytes_list
+                )
+        else:
+            with profile_phase("model_call"):
+                result, usage = await admission_service.run(
+                    supabase_service.user_id,
+                    "analyze",
+                    IMAGE_TOKEN_ESTIMATE * len(image_bytes_list)
+                    + RECEIPT_RESPONSE_TOKEN_ESTIMATE,
+                    gemini_service.analyze_receipt_with_usage,
+                    image_bytes_list,
+                )
+            extraction = {
+                "prompt_tokens": usage["prompt_tokens"],
+                "response_tokens": usage["response_tokens"],
+            }
+
+        items_total = sum(len(r.get("items", [])) for r in result.get("receipts", []))
+        extraction["mode"] = mode
+        extraction["latency_ms"] = round((time.monotonic() - started_at) * 1000)
+        extraction["items_total"] = items_total
+        extraction["items_classified_locally"] = items_total - extraction.get(
+            "items_classified_by_model", items_total
+        )
+        extraction_stats.record(mode, extraction)
 
-        if item_names:
-            learned_data = await asyncio.to_thread(
-                supabase_service.get_learned_categories, item_names
+        with profile_phase("apply_learned_categories"):
+            await asyncio.to_thread(
+                supabase_service.apply_learned_categories, result.get("receipts", [])
             )
 
+        with profile_phase("find_duplicates"):
+            # 1 回のアップロードに複数のレシートが写っている場合、画像ハッシュは
+            # どのレシートのものとも言えないので、日付・店舗・金額だけで照合する
+            image_hashes = []
+            if len(result.get("receipts", [])) == 1:
+                image_hashes = await asyncio.to_thread(
+                    compute_image_hashes, image_bytes_list
+                )
             for receipt in result.get("receipts", []):
-                for item in receipt.get("items", []):
-                    name = item["item_name"]
-                    if name in learned_data:
-                        pref = learned_data[name]
-                        if pref.get("main_category") is not None:
-                            item["main_category"] = pref["main_category"]
-                        if pref.get("sub_category") is not None:
-                            item["sub_category"] = pref["sub_category"]
-                        if pref.get("is_comparable") is not None:
-                            item["is_comparable"] = pref["is_comparable"]
-
+                receipt["image_hashes"] = image_hashes
+                matches = await asyncio.to_thread(
+                    duplicate_service.find_duplicates,
+                    supabase_service,
+                    receipt,
+                    image_hashes,
+                )
+                receipt["duplicates"] = [
+                    m for m in matches if m["confidence"] == "high"
+                ]
+                receipt["possible_duplicates"] = [
+                    m for m in matches if m["confidence"] == "low"
+                ]
+
+        result["extraction"] = extraction
         return result
 
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/analyze/stats")
+async def get_analyze_stats(
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    return extraction_stats.summary()
+
+
 @app.post("/save")
 async def save_receipt(
-    data: ReceiptData,
+    data: ReceiptSaveRequest,
+    reject_duplicates: bool = False,
     supabase_service: SupabaseService = Depends(get_supabase_service),
 ):
+    if reject_duplicates:
+        # 画像だけが似ている弱い候補では拒否しない
+        duplicates = [
+            match
+            for match in await asyncio.to_thread(
+                duplicate_service.find_duplicates,
+                supabase_service,
+                data.model_dump(),
+                data.image_hashes,
+            )
+            if match["confidence"] == "high"
+        ]
+        if duplicates:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "同じレシートが既に保存されている可能性があります。",
+                    "duplicates": duplicates,
+                },
+            )
+
     try:
         result = await asyncio.to_thread(supabase_service.add_receipt_data, data)
+        record_receipt_change(
+            supabase_service.user_id,
+            result["receipt_id"],
+            {
+                "date": data.purchase_date,
+                "store_name": data.store_name,
+                "total_amount": data.total_amount,
+                "receipt_items": [item.model_dump() for item in data.items],
+            },
+            data.image_hashes,
+        )
         return {"message": "Receipt data saved successfully.", "details": result}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def answer_in_chat_session(
+    supabase_service: SupabaseService, search_query: SearchQuery
+) -> dict:
+    user_id = supabase_service.user_id
+    session = chat_session_service.get(
+        user_id, search_query.session_id, search_query.data_type, search_query.period
+    )
+
+    if session is None:
+        # 構築中に入った変更で失効させられるよう、データ取得前の版を控えておく
+        data_version = chat_session_service.get_data_version(user_id)
+        with profile_phase("get_all_data"):
+            data = await asyncio.to_thread(
+                supabase_service.get_all_data,
+                data_type=search_query.data_type,
+                period=search_query.period,
+            )
+        if not data or len(data.strip().split("\n")) <= 1:
+            return {
+                "answer": "合致するレシートデータが存在しません。",
+                "session_id": None,
+            }
+
+        # Gemini 側のキャッシュの期限は作成時から数えるので、その前の時刻を起点にする
+        created_at = time.monotonic()
+        cache_name = None
+        data_tokens = estimate_text_tokens(data)
+        if data_tokens >= MIN_CACHE_TOKENS:
+            # キャッシュ作成もデータ全体を入力するため、回答と同じ予算と同時実行枠で扱う
+            try:
+                with profile_phase("create_context_cache"):
+                    cache_name, _ = await admission_service.run(
+                        user_id,
+                        "search",
+                        data_tokens,
+                        gemini_service.create_answer_cache_with_usage,
+                        data,
+                        chat_session_service.ttl_seconds,
+                    )
+            except AdmissionRejected:
+                raise
+            except Exception:
+                # キャッシュが使えない場合は毎回データを送る
+                pass
+        session = chat_session_service.create(
+            user_id,
+            search_query.data_type,
+            search_query.period,
+            data,
+            cache_name,
+            data_version,
+            created_at,
+        )
+
+    history = chat_session_service.get_history(session)
+    history_text = "".join(q + a for q, a in history)
+    estimate = (
+        estimate_text_tokens(history_text + search_query.query)
+        + ANSWER_RESPONSE_TOKEN_ESTIMATE
+    )
+    context_estimate = estimate_text_tokens(session.context_data)
+    cache_name = session.cache_name
+
+    with profile_phase("model_call"):
+        try:
+            answer, _ = await admission_service.run(
+                user_id,
+                "search",
+                estimate + (0 if cache_name else context_estimate),
+                gemini_service.answer_in_session_with_usage,
+                search_query.query,
+                history,
+                session.context_data,
+                cache_name,
+            )
+        except AdmissionRejected:
+            raise
+        except Exception:
+            if cache_name is None:
+                raise
+            # 期限切れや並行する無効化でキャッシュが消えていた場合は、データを添えて 1 回だけ再試行する
+            chat_session_service.clear_cache(session)
+            answer, _ = await admission_service.run(
+                user_id,
+                "search",
+                estimate + context_estimate,
+                gemini_service.answer_in_session_with_usage,
+                search_query.query,
+                history,
+                session.context_data,
+                None,
+            )
+    chat_session_service.add_turn(session, search_query.query, answer)
+    return {"answer": answer, "session_id": session.session_id}
+
+
 @app.post("/search")
 async def search_receipts(
     search_query: SearchQuery,
     supabase_service: SupabaseService = Depends(get_supabase_service),
 ):
     try:
-        data = supabase_service.get_all_data(
-            data_type=search_query.data_type, period=search_query.period
-        )
+        if search_query.chat_session:
+            return await answer_in_chat_session(supabase_service, search_query)
+
+        with profile_phase("get_all_data"):
+            data = await asyncio.to_thread(
+                supabase_service.get_all_data,
+                data_type=search_query.data_type,
+                period=search_query.period,
+            )
         if not data or len(data.strip().split("\n")) <= 1:
             return {"answer": "合致するレシートデータが存在しません。"}
 
-        answer = gemini_service.answer_question(search_query.query, data)
+        with profile_phase("model_call"):
+            answer, _ = await admission_service.run(
+                supabase_service.user_id,
+                "search",
+                estimate_text_tokens(data + search_query.query)
+                + ANSWER_RESPONSE_TOKEN_ESTIMATE,
+                gemini_service.answer_question_with_usage,
+                search_query.query,
+                data,
+            )
         return {"answer": answer}
 
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/usage")
+async def get_usage(
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    return admission_service.get_usage(supabase_service.user_id)
+
+
 @app.get("/available_months")
 async def get_available_months(
     supabase_service: SupabaseService = Depends(get_supabase_service),
@@ -132,24 +499,69 @@ async def get_transactions(
 ):
     try:
         data = supabase_service.get_transactions_by_month(month)
-        return data
+        return FastJSONResponse(data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/analyze_csv")
-async def analyze_csv(request: CsvAnalysisRequest):
+@app.get("/sync")
+async def sync_changes(
+    cursor: str | None = None,
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    try:
+        changes = await asyncio.to_thread(
+            sync_service.get_changes, supabase_service, cursor
+        )
+        return FastJSONResponse(changes)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/export/{table}")
+async def export_table(
+    table: str,
+    export_format: str = Query("csv", alias="format"),
+    gzip: bool = True,
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    try:
+        export_service.validate(table, export_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = export_service.filename(table, export_format, gzip)
+    return StreamingResponse(
+        export_service.stream(supabase_service, table, export_format, gzip),
+        media_type=export_service.media_type(export_format, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.post("/analyze_csv", response_model=CsvParseResponse)
+async def analyze_csv(
+    request: CsvAnalysisRequest,
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
     try:
         if request.mapping is not None:
             mapping = request.mapping
         else:
             lines = request.csv_text.strip().split("\n")
             sample_text = "\n".join(lines[:5])
-            mapping = gemini_service.analyze_csv(sample_text)
+            mapping, _ = await admission_service.run(
+                supabase_service.user_id,
+                "analyze_csv",
+                estimate_text_tokens(sample_text) + CSV_MAPPING_RESPONSE_TOKEN_ESTIMATE,
+                gemini_service.analyze_csv_with_usage,
+                sample_text,
+            )
 
         transactions = csv_service.parse_csv(request.csv_text, mapping)
 
-        return CsvParseResponse(transactions=transactions, mapping=mapping)
+        return FastJSONResponse({"transactions": transactions, "mapping": mapping})
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -161,11 +573,79 @@ async def save_csv(
 ):
     try:
         result = supabase_service.add_csv_data(request.transactions)
+        chat_session_service.invalidate_user(supabase_service.user_id)
         return {"message": "CSV data saved successfully.", "details": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.put("/receipts/bulk")
+async def update_receipts_bulk(
+    payload: ReceiptBulkUpdateRequest,
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    try:
+        results = await asyncio.to_thread(
+            supabase_service.update_receipts, payload.receipts
+        )
+        receipts_by_id = {r.id: r.model_dump() for r in payload.receipts}
+        for result in results:
+            if result["status"] == "updated":
+                record_receipt_change(
+                    supabase_service.user_id,
+                    result["id"],
+                    receipts_by_id[result["id"]],
+                )
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.put("/csv_transactions/bulk")
+async def update_csv_transactions_bulk(
+    payload: CsvBulkUpdateRequest,
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    try:
+        results = await asyncio.to_thread(
+            supabase_service.update_csv_transactions, payload.transactions
+        )
+        chat_session_service.invalidate_user(supabase_service.user_id)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/receipts/bulk_delete")
+async def delete_receipts_bulk(
+    payload: BulkDeleteRequest,
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    try:
+        results = await asyncio.to_thread(supabase_service.delete_receipts, payload.ids)
+        for result in results:
+            if result["status"] == "deleted":
+                remove_receipt_change(supabase_service.user_id, result["id"])
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/csv_transactions/bulk_delete")
+async def delete_csv_transactions_bulk(
+    payload: BulkDeleteRequest,
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    try:
+        results = await asyncio.to_thread(
+            supabase_service.delete_csv_transactions, payload.ids
+        )
+        chat_session_service.invalidate_user(supabase_service.user_id)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.put("/receipts/{receipt_id}")
 async def update_receipt(
     receipt_id: str,
@@ -174,6 +654,7 @@ async def update_receipt(
 ):
     try:
         result = supabase_service.update_receipt(receipt_id, payload)
+        record_receipt_change(supabase_service.user_id, receipt_id, payload)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -187,6 +668,7 @@ async def update_csv_transaction(
 ):
     try:
         result = supabase_service.update_csv_transaction(transaction_id, payload)
+        chat_session_service.invalidate_user(supabase_service.user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -199,6 +681,7 @@ async def delete_receipt(
 ):
     try:
         result = supabase_service.delete_receipt(receipt_id)
+        remove_receipt_change(supabase_service.user_id, receipt_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -211,6 +694,7 @@ async def delete_csv_transaction(
 ):
     try:
         result = supabase_service.delete_csv_transaction(transaction_id)
+        chat_session_service.invalidate_user(supabase_service.user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -223,7 +707,27 @@ async def search_memo_items(
 ):
     try:
         data = supabase_service.search_items_for_memo(query)
-        return {"items": data}
+        return FastJSONResponse({"items": data})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/memo/price_history")
+async def get_price_history(
+    query: str,
+    max_points: int = Query(60, ge=2, le=365),
+    max_recent: int = Query(30, ge=0, le=200),
+    supabase_service: SupabaseService = Depends(get_supabase_service),
+):
+    try:
+        items = await asyncio.to_thread(
+            price_history_service.get_price_trends,
+            supabase_service,
+            query,
+            max_points,
+            max_recent,
+        )
+        return {"items": items}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -278,3 +782,18 @@ async def delete_memo_row(
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return await asyncio.to_thread(profile_store.list)
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    path = profile_store.get_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        path, media_type="application/json", filename=f"{profile_id}.speedscope.json"
+    )
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import Any
 
 from pydantic import BaseModel, Field
@@ -29,6 +30,14 @@ class ParsedCsvTransaction(BaseModel):
     price: int
 
 
+@dataclass(slots=True)
+class CsvRow:
+    # パーサーが型を保証しているので、レスポンス用にはモデル検証を省いた軽量な行を使う
+    date: str
+    store: str
+    price: int
+
+
 class CsvParseResponse(BaseModel):
     transactions: list[ParsedCsvTransaction]
     mapping: dict[str, Any]
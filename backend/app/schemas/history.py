@@ -0,0 +1,31 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class BulkDeleteRequest(BaseModel):
+    ids: list[str]
+
+
+class CsvTransactionUpdate(BaseModel):
+    id: str
+    date: str
+    store: str
+    price: int
+
+
+class CsvBulkUpdateRequest(BaseModel):
+    transactions: list[CsvTransactionUpdate]
+
+
+class ReceiptUpdate(BaseModel):
+    id: str
+    date: str | None = None
+    store_name: str | None = None
+    total_amount: int | None = None
+    payment_method: str = "unknown"
+    receipt_items: list[dict[str, Any]] = []
+
+
+class ReceiptBulkUpdateRequest(BaseModel):
+    receipts: list[ReceiptUpdate]
@@ -1,44 +1,75 @@
 from pydantic import BaseModel, Field
 
+ITEM_NAME_DESCRIPTION = "Name of the the product"
+PRICE_DESCRIPTION = "Price of the product exactly as printed on the receipt. DO NOT calculate or add tax manually."
+MAIN_CATEGORY_DESCRIPTION = "Must be exactly one of: '食費', '日用品', '交通・通信', '衣服・美容', '趣味・娯楽', '医療・健康', '住居・家具', 'その他'."
+SUB_CATEGORY_DESCRIPTION = "General sub-category of the item (e.g., '野菜', '肉類', '調味料', '洗剤', '食器', '文房具', 'スマホ周辺機器')."
+SEARCH_TAGS_DESCRIPTION = "3 to 5 search keywords including general names, synonyms, and use cases (e.g., for 'ｻｰﾓｽ ﾏｸﾞ', use ['コップ', 'マグカップ', 'グラス', '水筒', '食器'])."
+PURCHASE_DATE_DESCRIPTION = "Date of purchase in YYYY-MM-DD format"
+STORE_NAME_DESCRIPTION = "Name of the store"
+ITEMS_DESCRIPTION = "List of actual purchased products. DO NOT include subtotal (小計), tax (外税/内税/消費税), or total (合計) rows."
+TOTAL_AMOUNT_DESCRIPTION = "The final total amount paid (Tax included). MUST extract the value explicitly printed on the receipt (e.g., marked as '合計', 'Total'). DO NOT calculate the sum of items."
+PAYMENT_METHOD_DESCRIPTION = "Payment method. Return 'cash' if keywords like '現金', 'お預り', '釣銭' (Change) are present. Return 'cashless' if keywords like 'Credit', 'Card', 'PayPay', 'IC', 'Suica', 'iD', 'QuicPay' are present."
 
-class ReceiptItem(BaseModel):
-    item_name: str = Field(description="Name of the the product")
-    price: int = Field(
-        description="Price of the product exactly as printed on the receipt. DO NOT calculate or add tax manually."
-    )
-    main_category: str = Field(
-        description="Must be exactly one of: '食費', '日用品', '交通・通信', '衣服・美容', '趣味・娯楽', '医療・健康', '住居・家具', 'その他'."
-    )
-    sub_category: str = Field(
-        description="General sub-category of the item (e.g., '野菜', '肉類', '調味料', '洗剤', '食器', '文房具', 'スマホ周辺機器')."
-    )
-    search_tags: list[str] = Field(
-        description="3 to 5 search keywords including general names, synonyms, and use cases (e.g., for 'ｻｰﾓｽ ﾏｸﾞ', use ['コップ', 'マグカップ', 'グラス', '水筒', '食器'])."
-    )
+
+class LeanReceiptItem(BaseModel):
+    item_name: str = Field(description=ITEM_NAME_DESCRIPTION)
+    price: int = Field(description=PRICE_DESCRIPTION)
+
+
+class ReceiptItem(LeanReceiptItem):
+    main_category: str = Field(description=MAIN_CATEGORY_DESCRIPTION)
+    sub_category: str = Field(description=SUB_CATEGORY_DESCRIPTION)
+    search_tags: list[str] = Field(description=SEARCH_TAGS_DESCRIPTION)
     is_comparable: bool = Field(
         description="Always return true. The app defaults price-trend (memo chart) to ON for every line; users turn it off in the editor if needed. (Server also forces true before save; past per-item choices may be restored from stored preferences.)"
     )
 
 
+class LeanReceiptData(BaseModel):
+    purchase_date: str = Field(description=PURCHASE_DATE_DESCRIPTION)
+    store_name: str = Field(description=STORE_NAME_DESCRIPTION)
+    items: list[LeanReceiptItem] = Field(description=ITEMS_DESCRIPTION)
+    total_amount: int = Field(description=TOTAL_AMOUNT_DESCRIPTION)
+    payment_method: str = Field(description=PAYMENT_METHOD_DESCRIPTION)
+
+
 class ReceiptData(BaseModel):
-    purchase_date: str = Field(description="Date of purchase in YYYY-MM-DD format")
-    store_name: str = Field(description="Name of the store")
-    items: list[ReceiptItem] = Field(
-        description="List of actual purchased products. DO NOT include subtotal (小計), tax (外税/内税/消費税), or total (合計) rows."
-    )
-    total_amount: int = Field(
-        description="The final total amount paid (Tax included). MUST extract the value explicitly printed on the receipt (e.g., marked as '合計', 'Total'). DO NOT calculate the sum of items."
-    )
-    payment_method: str = Field(
-        description="Payment method. Return 'cash' if keywords like '現金', 'お預り', '釣銭' (Change) are present. Return 'cashless' if keywords like 'Credit', 'Card', 'PayPay', 'IC', 'Suica', 'iD', 'QuicPay' are present."
-    )
+    purchase_date: str = Field(description=PURCHASE_DATE_DESCRIPTION)
+    store_name: str = Field(description=STORE_NAME_DESCRIPTION)
+    items: list[ReceiptItem] = Field(description=ITEMS_DESCRIPTION)
+    total_amount: int = Field(description=TOTAL_AMOUNT_DESCRIPTION)
+    payment_method: str = Field(description=PAYMENT_METHOD_DESCRIPTION)
+
+
+class ReceiptSaveRequest(ReceiptData):
+    image_hashes: list[str] = []
 
 
 class ReceiptDatas(BaseModel):
     receipts: list[ReceiptData]
 
 
+class LeanReceiptDatas(BaseModel):
+    receipts: list[LeanReceiptData]
+
+
+class ItemLabel(BaseModel):
+    item_name: str = Field(
+        description="The item name exactly as given in the input list."
+    )
+    main_category: str = Field(description=MAIN_CATEGORY_DESCRIPTION)
+    sub_category: str = Field(description=SUB_CATEGORY_DESCRIPTION)
+    search_tags: list[str] = Field(description=SEARCH_TAGS_DESCRIPTION)
+
+
+class ItemLabels(BaseModel):
+    items: list[ItemLabel]
+
+
 class SearchQuery(BaseModel):
     query: str
     data_type: str = "all"
     period: str = "3months"
+    chat_session: bool = False
+    session_id: str | None = None
@@ -0,0 +1,263 @@
+"""Bulk-ingest a directory of scanned receipt images.
+
+Usage:
+    uv run python -m app.scripts.ingest_receipts ./scans --token <supabase token>
+    uv run python -m app.scripts.ingest_receipts ./scans --refresh-token <refresh token>
+
+Each image is treated as one receipt. Progress is written to a checkpoint
+file after every saved batch, so an interrupted run can be resumed by
+running the same command again. Access tokens expire after about an hour;
+pass a refresh token instead for long runs and the session is refreshed
+before it expires.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from app.schemas.receipt import ReceiptData, ReceiptSaveRequest
+from app.services.duplicate_service import compute_image_hash
+from app.services.gemini_service import GeminiService
+from app.services.supabase_service import SupabaseService
+from PIL import Image, ImageOps
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def find_images(directory: Path) -> list[Path]:
+    return sorted(
+        path
+        for path in directory.rglob("*")
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def preprocess_image(path: str, max_size: int) -> bytes:
+    # プロセスプールで実行されるため、モジュールトップレベルの関数にしておく
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    with Image.open(io.BytesIO(raw)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((max_size, max_size))
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=85)
+        return output.getvalue()
+
+
+class Checkpoint:
+    def __init__(self, path: Path):
+        self.path = path
+        self.done: dict[str, dict] = {}
+        if path.exists():
+            self.done = json.loads(path.read_text(encoding="utf-8"))
+
+    def is_done(self, image_path: Path) -> bool:
+        entry = self.done.get(str(image_path))
+        return entry is not None and entry.get("status") == "saved"
+
+    def mark(self, image_path: Path, entry: dict) -> None:
+        self.done[str(image_path)] = entry
+
+    def save(self) -> None:
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(
+            json.dumps(self.done, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        os.replace(tmp_path, self.path)
+
+
+class IngestStats:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.images = 0
+        self.receipts = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+
+    def add_usage(self, usage: dict) -> None:
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.response_tokens += usage.get("response_tokens", 0)
+
+    def report(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        per_minute = self.images / elapsed * 60 if elapsed > 0 else 0.0
+        return (
+            f"images: {self.images} ({per_minute:.1f}/min), "
+            f"receipts saved: {self.receipts}, failures: {self.failures}, "
+            f"tokens: {self.prompt_tokens} prompt / {self.response_tokens} response, "
+            f"elapsed: {elapsed:.1f}s"
+        )
+
+
+class ReceiptIngester:
+    def __init__(
+        self,
+        gemini_service: GeminiService,
+        supabase_service: SupabaseService,
+        checkpoint: Checkpoint,
+        concurrency: int,
+        batch_size: int,
+        workers: int,
+        max_size: int,
+    ):
+        self.gemini_service = gemini_service
+        self.supabase_service = supabase_service
+        self.checkpoint = checkpoint
+        # 前処理はモデル呼び出しの先を走れるよう、段ごとに別の上限を設ける。
+        # pipeline は前処理済みで解析待ちの画像がメモリに溜まりすぎないための上限
+        self.pipeline = asyncio.Semaphore(concurrency + workers * 2)
+        self.analyze_semaphore = asyncio.Semaphore(concurrency)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_size = max_size
+        self.stats = IngestStats()
+        self.pending: list[tuple[Path, list[ReceiptData]]] = []
+        self.save_lock = asyncio.Lock()
+
+    async def run(self, image_paths: list[Path]) -> IngestStats:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            tasks = [
+                self._process(loop, pool, image_path) for image_path in image_paths
+            ]
+            await asyncio.gather(*tasks)
+
+        await self._flush()
+        return self.stats
+
+    async def _process(self, loop, pool, image_path: Path) -> None:
+        async with self.pipeline:
+            try:
+                image_bytes = await loop.run_in_executor(
+                    pool, preprocess_image, str(image_path), self.max_size
+                )
+                async with self.analyze_semaphore:
+                    result, usage = await asyncio.to_thread(
+                        self.gemini_service.analyze_receipt_with_usage, [image_bytes]
+                    )
+                self.stats.add_usage(usage)
+
+                receipts = result.get("receipts", [])
+                await asyncio.to_thread(self.supabase_service.ensure_fresh_session)
+                await asyncio.to_thread(
+                    self.supabase_service.apply_learned_categories, receipts
+                )
+                # /analyze と同じく、1 枚の画像に 1 件のときだけ画像ハッシュを紐づける
+                image_hashes = []
+                if len(receipts) == 1:
+                    image_hash = await loop.run_in_executor(
+                        pool, compute_image_hash, image_bytes
+                    )
+                    image_hashes = [image_hash] if image_hash else []
+                parsed = [
+                    ReceiptSaveRequest(**receipt, image_hashes=image_hashes)
+                    for receipt in receipts
+                ]
+            except Exception as e:
+                print(f"Failed to analyze {image_path}: {e}")
+                self.stats.images += 1
+                self.stats.failures += 1
+                self.checkpoint.mark(image_path, {"status": "failed", "error": str(e)})
+                return
+
+        self.stats.images += 1
+        self.pending.append((image_path, parsed))
+        if len(self.pending) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        async with self.save_lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, []
+
+            receipts = [receipt for _, parsed in batch for receipt in parsed]
+            try:
+                await asyncio.to_thread(self.supabase_service.ensure_fresh_session)
+                saved = await asyncio.to_thread(
+                    self.supabase_service.add_receipts_bulk, receipts
+                )
+            except Exception as e:
+                print(f"Failed to save batch of {len(batch)} images: {e}")
+                self.stats.failures += len(batch)
+                for image_path, _ in batch:
+                    self.checkpoint.mark(
+                        image_path, {"status": "failed", "error": str(e)}
+                    )
+                self.checkpoint.save()
+                return
+
+            offset = 0
+            for image_path, parsed in batch:
+                receipt_ids = [
+                    entry["receipt_id"]
+                    for entry in saved[offset : offset + len(parsed)]
+                ]
+                offset += len(parsed)
+                self.checkpoint.mark(
+                    image_path, {"status": "saved", "receipt_ids": receipt_ids}
+                )
+
+            self.stats.receipts += len(saved)
+            self.checkpoint.save()
+            print(self.stats.report())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-ingest receipt images.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--token", default=os.environ.get("SUPABASE_TOKEN"))
+    parser.add_argument(
+        "--refresh-token", default=os.environ.get("SUPABASE_REFRESH_TOKEN")
+    )
+    parser.add_argument("--checkpoint", type=Path, default=None)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-size", type=int, default=2048)
+    return parser.parse_args()
+
+
+def main() -> None:
+    load_dotenv()
+    args = parse_args()
+
+    if not args.token and not args.refresh_token:
+        raise SystemExit(
+            "Supabase access token (--token) or refresh token (--refresh-token) is required."
+        )
+
+    checkpoint = Checkpoint(
+        args.checkpoint or args.directory / ".ingest_checkpoint.json"
+    )
+    image_paths = [
+        path for path in find_images(args.directory) if not checkpoint.is_done(path)
+    ]
+    print(f"{len(image_paths)} images to ingest.")
+
+    ingester = ReceiptIngester(
+        gemini_service=GeminiService(),
+        supabase_service=SupabaseService(
+            token=args.token, refresh_token=args.refresh_token
+        ),
+        checkpoint=checkpoint,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        max_size=args.max_size,
+    )
+    stats = asyncio.run(ingester.run(image_paths))
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
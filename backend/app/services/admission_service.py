@@ -0,0 +1,228 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+# エンドポイントごとの優先度。キューで待てるのは min_queue_priority 以上のみ
+ENDPOINT_PRIORITIES = {
+    "analyze": 2,
+    "search": 1,
+    "analyze_csv": 0,
+}
+
+IMAGE_TOKEN_ESTIMATE = 1500
+RECEIPT_RESPONSE_TOKEN_ESTIMATE = 2500
+LEAN_RECEIPT_RESPONSE_TOKEN_ESTIMATE = 800
+ITEM_LABEL_TOKEN_ESTIMATE = 60
+ANSWER_RESPONSE_TOKEN_ESTIMATE = 800
+CSV_MAPPING_RESPONSE_TOKEN_ESTIMATE = 100
+
+
+def estimate_text_tokens(text: str) -> int:
+    # 日本語主体のテキストは概ね 1 トークン 2 文字程度として見積もる
+    return math.ceil(len(text) / 2)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, retry_after)
+
+
+class SlidingWindow:
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        self.entries: dict[tuple, deque[list]] = defaultdict(deque)
+
+    def _prune(self, key: tuple, now: float) -> deque[list]:
+        entries = self.entries[key]
+        while entries and entries[0][0] <= now - self.window_seconds:
+            entries.popleft()
+        return entries
+
+    def usage(self, key: tuple, now: float) -> int:
+        return sum(entry[1] for entry in self._prune(key, now))
+
+    def add(self, key: tuple, tokens: int, now: float) -> list:
+        # [timestamp, tokens] を返し、呼び出し後に実績値で上書きできるようにする
+        entry = [now, tokens]
+        self.entries[key].append(entry)
+        return entry
+
+    def retry_after(self, key: tuple, needed: int, budget: int, now: float) -> int:
+        entries = self._prune(key, now)
+        excess = sum(entry[1] for entry in entries) + needed - budget
+        for timestamp, tokens in entries:
+            excess -= tokens
+            if excess <= 0:
+                return math.ceil(timestamp + self.window_seconds - now)
+        return self.window_seconds
+
+
+class AdmissionService:
+    def __init__(self):
+        self.max_concurrency = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4"))
+        self.max_queue = int(os.environ.get("GEMINI_MAX_QUEUE", "8"))
+        self.queue_timeout = float(os.environ.get("GEMINI_QUEUE_TIMEOUT", "20"))
+        self.min_queue_priority = int(os.environ.get("GEMINI_MIN_QUEUE_PRIORITY", "1"))
+        self.user_budget = int(os.environ.get("GEMINI_USER_TOKEN_BUDGET", "300000"))
+        self.endpoint_budgets = {
+            "analyze": int(os.environ.get("GEMINI_ANALYZE_TOKEN_BUDGET", "200000")),
+            "search": int(os.environ.get("GEMINI_SEARCH_TOKEN_BUDGET", "200000")),
+            "analyze_csv": int(
+                os.environ.get("GEMINI_ANALYZE_CSV_TOKEN_BUDGET", "20000")
+            ),
+        }
+        window_seconds = int(os.environ.get("GEMINI_BUDGET_WINDOW_SECONDS", "3600"))
+
+        self.user_windows = SlidingWindow(window_seconds)
+        self.endpoint_windows = SlidingWindow(window_seconds)
+
+        # モデル呼び出しは専用スレッドプールで実行し、Supabase だけの軽い処理が
+        # 使う既定のスレッドプールを占有しないようにする
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="gemini"
+        )
+        self._active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._average_seconds = 5.0
+
+    def _check_budget(self, user_id: str, endpoint: str, estimate: int) -> None:
+        now = time.monotonic()
+
+        user_key = (user_id,)
+        if self.user_windows.usage(user_key, now) + estimate > self.user_budget:
+            raise AdmissionRejected(
+                "Token budget exceeded. Please try again later.",
+                self.user_windows.retry_after(
+                    user_key, estimate, self.user_budget, now
+                ),
+            )
+
+        endpoint_key = (user_id, endpoint)
+        endpoint_budget = self.endpoint_budgets[endpoint]
+        if self.endpoint_windows.usage(endpoint_key, now) + estimate > endpoint_budget:
+            raise AdmissionRejected(
+                f"Token budget for {endpoint} exceeded. Please try again later.",
+                self.endpoint_windows.retry_after(
+                    endpoint_key, estimate, endpoint_budget, now
+                ),
+            )
+
+    def _overload_retry_after(self) -> int:
+        pending = len(self._waiters) + 1
+        return math.ceil(self._average_seconds * pending / self.max_concurrency)
+
+    async def _acquire(self, priority: int) -> None:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+
+        if priority < self.min_queue_priority or len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected(
+                "Server is busy. Please try again later.",
+                self._overload_retry_after(),
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (-priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, waiter)
+
+        try:
+            done, _ = await asyncio.wait({future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if future.done():
+                self._release()
+            else:
+                self._remove_waiter(waiter)
+            raise
+
+        if not done:
+            self._remove_waiter(waiter)
+            raise AdmissionRejected(
+                "Server is busy. Please try again later.",
+                self._overload_retry_after(),
+            )
+
+    def _remove_waiter(self, waiter: tuple) -> None:
+        waiter[2].cancel()
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+
+    def _release(self) -> None:
+        # 待機中で優先度が最も高いリクエストへ実行枠をそのまま引き渡す
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    async def run(
+        self,
+        user_id: str,
+        endpoint: str,
+        estimated_tokens: int,
+        func: Callable[..., tuple[Any, dict]],
+        *args: Any,
+    ) -> tuple[Any, dict]:
+        self._check_budget(user_id, endpoint, estimated_tokens)
+
+        now = time.monotonic()
+        user_entry = self.user_windows.add((user_id,), estimated_tokens, now)
+        endpoint_entry = self.endpoint_windows.add(
+            (user_id, endpoint), estimated_tokens, now
+        )
+
+        try:
+            await self._acquire(ENDPOINT_PRIORITIES[endpoint])
+        except BaseException:
+            user_entry[1] = endpoint_entry[1] = 0
+            raise
+
+        started_at = time.monotonic()
+        try:
+            # asyncio.to_thread と同様に Context を引き継ぎ、プロファイル等から追えるようにする
+            result, usage = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                functools.partial(contextvars.copy_context().run, func, *args),
+            )
+        except BaseException:
+            user_entry[1] = endpoint_entry[1] = 0
+            raise
+        finally:
+            elapsed = time.monotonic() - started_at
+            self._average_seconds = self._average_seconds * 0.8 + elapsed * 0.2
+            self._release()
+
+        actual = usage.get("total_tokens") or estimated_tokens
+        user_entry[1] = endpoint_entry[1] = actual
+        return result, usage
+
+    def get_usage(self, user_id: str) -> dict:
+        now = time.monotonic()
+        return {
+            "window_seconds": self.user_windows.window_seconds,
+            "total": {
+                "used": self.user_windows.usage((user_id,), now),
+                "budget": self.user_budget,
+            },
+            "endpoints": {
+                endpoint: {
+                    "used": self.endpoint_windows.usage((user_id, endpoint), now),
+                    "budget": budget,
+                }
+                for endpoint, budget in self.endpoint_budgets.items()
+            },
+        }
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+MAX_HISTORY_TURNS = 6
+MAX_SESSIONS_PER_USER = 5
+# 明示的なコンテキストキャッシュには最小トークン数があるため、小さいデータは送らない
+MIN_CACHE_TOKENS = 2048
+# キャッシュの期限より少し早くセッションを失効させ、期限切れのキャッシュを参照しないようにする
+CACHE_EXPIRY_MARGIN_SECONDS = 60
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    user_id: str
+    data_type: str
+    period: str
+    context_data: str
+    cache_name: str | None
+    data_version: int
+    created_at: float
+    history: deque = field(default_factory=lambda: deque(maxlen=MAX_HISTORY_TURNS))
+
+
+class ChatSessionService:
+    def __init__(self, delete_cache: Callable[[str], None] | None = None):
+        # Gemini 側のキャッシュと同じ期限で失効させ、期限切れのキャッシュを参照しないようにする
+        self.ttl_seconds = int(os.environ.get("CHAT_SESSION_TTL_SECONDS", "1800"))
+        self.delete_cache = delete_cache
+        self._sessions: dict[str, ChatSession] = {}
+        self._data_versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        # キャッシュの削除は API 呼び出しなので、イベントループを止めないよう別スレッドで行う
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="chat-cache-cleanup"
+        )
+
+    def _discard(self, sessions: list[ChatSession]) -> None:
+        # 破棄したセッションのキャッシュは期限を待たずに消し、保存料金を止める
+        if self.delete_cache is None:
+            return
+        for session in sessions:
+            if session.cache_name:
+                self._executor.submit(self.delete_cache, session.cache_name)
+
+    def _is_valid(self, session: ChatSession, now: float) -> bool:
+        return (
+            now - session.created_at < self.ttl_seconds - CACHE_EXPIRY_MARGIN_SECONDS
+            and session.data_version == self._data_versions.get(session.user_id, 0)
+        )
+
+    def get(
+        self, user_id: str, session_id: str | None, data_type: str, period: str
+    ) -> ChatSession | None:
+        if not session_id:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if (
+                session is None
+                or session.user_id != user_id
+                or session.data_type != data_type
+                or session.period != period
+            ):
+                return None
+            if self._is_valid(session, now):
+                return session
+            del self._sessions[session_id]
+        self._discard([session])
+        return None
+
+    def create(
+        self,
+        user_id: str,
+        data_type: str,
+        period: str,
+        context_data: str,
+        cache_name: str | None,
+        data_version: int,
+        created_at: float,
+    ) -> ChatSession:
+        # created_at はキャッシュ作成前に控えた時刻 (Gemini 側の TTL はその後に始まる)
+        session = ChatSession(
+            session_id=uuid.uuid4().hex,
+            user_id=user_id,
+            data_type=data_type,
+            period=period,
+            context_data=context_data,
+            cache_name=cache_name,
+            data_version=data_version,
+            created_at=created_at,
+        )
+
+        now = time.monotonic()
+        discarded = []
+        with self._lock:
+            for session_id, other in list(self._sessions.items()):
+                if not self._is_valid(other, now):
+                    discarded.append(self._sessions.pop(session_id))
+
+            user_sessions = sorted(
+                (s for s in self._sessions.values() if s.user_id == user_id),
+                key=lambda s: s.created_at,
+            )
+            excess = len(user_sessions) + 1 - MAX_SESSIONS_PER_USER
+            for other in user_sessions[: max(0, excess)]:
+                discarded.append(self._sessions.pop(other.session_id))
+
+            self._sessions[session.session_id] = session
+        self._discard(discarded)
+        return session
+
+    def clear_cache(self, session: ChatSession) -> None:
+        # 参照できなかったキャッシュは使わず、以降はデータを毎回送る
+        with self._lock:
+            session.cache_name = None
+
+    def get_data_version(self, user_id: str) -> int:
+        with self._lock:
+            return self._data_versions.get(user_id, 0)
+
+    def add_turn(self, session: ChatSession, question: str, answer: str) -> None:
+        with self._lock:
+            session.history.append((question, answer))
+
+    def get_history(self, session: ChatSession) -> list[tuple[str, str]]:
+        with self._lock:
+            return list(session.history)
+
+    def invalidate_user(self, user_id: str) -> None:
+        # 構築中のセッションは版の不一致で次回参照時に作り直される
+        with self._lock:
+            self._data_versions[user_id] = self._data_versions.get(user_id, 0) + 1
+            discarded = [
+                self._sessions.pop(session_id)
+                for session_id, session in list(self._sessions.items())
+                if session.user_id == user_id
+            ]
+        self._discard(discarded)
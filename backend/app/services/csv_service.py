@@ -2,12 +2,12 @@ import csv
 import io
 import re
 
-from app.schemas.csv import ParsedCsvTransaction
+from app.schemas.csv import CsvRow
 from dateutil import parser
 
 
 class CsvService:
-    def parse_csv(self, csv_text: str, mapping: dict) -> list[ParsedCsvTransaction]:
+    def parse_csv(self, csv_text: str, mapping: dict) -> list[CsvRow]:
         parsed_transactions = []
         csv_reader = csv.reader(io.StringIO(csv_text))
 
@@ -44,11 +44,7 @@ class CsvService:
                     print(f"Date parsing failed for '{raw_date}': {e}")
                     continue
 
-                parsed_transactions.append(
-                    ParsedCsvTransaction(
-                        date=formatted_date, store=raw_store, price=price
-                    )
-                )
+                parsed_transactions.append(CsvRow(formatted_date, raw_store, price))
 
             except Exception as e:
                 print(f"Error processing row {i}: {e}")
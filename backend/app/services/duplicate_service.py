@@ -0,0 +1,247 @@
+import io
+import os
+import threading
+import time
+
+from app.utils.text import normalize_item_name
+from PIL import Image
+
+HASH_BITS = 64
+MAX_HAMMING_DISTANCE = 8
+# 距離 MAX_HAMMING_DISTANCE 以内の 2 つのハッシュは、鳩の巣原理で
+# MAX_HAMMING_DISTANCE + 1 本の帯のうち少なくとも 1 本が一致する
+HASH_BANDS = MAX_HAMMING_DISTANCE + 1
+HASH_BAND_RANGES = [
+    (HASH_BITS * band // HASH_BANDS, HASH_BITS * (band + 1) // HASH_BANDS)
+    for band in range(HASH_BANDS)
+]
+ITEM_SIMILARITY_THRESHOLD = 0.6
+
+
+def compute_image_hash(image_bytes: bytes) -> str | None:
+    # 64bit の dHash。撮り直しや圧縮率の違いでは数ビットしか変わらない
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            pixels = list(image.convert("L").resize((9, 8)).getdata())
+    except Exception as e:
+        print(f"Image hash failed: {e}")
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return f"{value:016x}"
+
+
+def compute_image_hashes(image_bytes_list: list[bytes]) -> list[str]:
+    hashes = [compute_image_hash(image_bytes) for image_bytes in image_bytes_list]
+    return [image_hash for image_hash in hashes if image_hash]
+
+
+def is_valid_hash(image_hash: str) -> bool:
+    return len(image_hash) == 16 and all(c in "0123456789abcdef" for c in image_hash)
+
+
+def item_similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class UserReceiptIndex:
+    def __init__(self):
+        self.loaded_at = 0.0
+        self.keys: dict[tuple, set[str]] = {}
+        self.receipts: dict[str, tuple[tuple, frozenset[str]]] = {}
+        self.hashes: dict[str, str] = {}
+        self.receipt_hashes: dict[str, list[str]] = {}
+        self.hash_bands: dict[tuple[int, int], set[str]] = {}
+
+    def _make_key(self, date: str, store_name: str, total_amount) -> tuple:
+        return (date, normalize_item_name(store_name or ""), total_amount)
+
+    def _make_item_set(self, items: list[dict]) -> frozenset[str]:
+        return frozenset(
+            normalize_item_name(item.get("item_name", "")) for item in items or []
+        )
+
+    def _bands(self, image_hash: str) -> list[tuple[int, int]]:
+        value = int(image_hash, 16)
+        return [
+            (band, (value >> start) & ((1 << (end - start)) - 1))
+            for band, (start, end) in enumerate(HASH_BAND_RANGES)
+        ]
+
+    def set_receipt(
+        self,
+        receipt_id: str,
+        date: str,
+        store_name: str,
+        total_amount,
+        items: list[dict],
+    ) -> None:
+        self.remove_receipt(receipt_id, keep_hashes=True)
+        key = self._make_key(date, store_name, total_amount)
+        self.keys.setdefault(key, set()).add(receipt_id)
+        self.receipts[receipt_id] = (key, self._make_item_set(items))
+
+    def add_image_hashes(self, receipt_id: str, image_hashes: list[str]) -> None:
+        for image_hash in image_hashes:
+            if not is_valid_hash(image_hash) or image_hash in self.hashes:
+                continue
+            self.hashes[image_hash] = receipt_id
+            self.receipt_hashes.setdefault(receipt_id, []).append(image_hash)
+            for band in self._bands(image_hash):
+                self.hash_bands.setdefault(band, set()).add(image_hash)
+
+    def remove_receipt(self, receipt_id: str, keep_hashes: bool = False) -> None:
+        entry = self.receipts.pop(receipt_id, None)
+        if entry is not None:
+            ids = self.keys.get(entry[0])
+            if ids is not None:
+                ids.discard(receipt_id)
+                if not ids:
+                    del self.keys[entry[0]]
+
+        if keep_hashes:
+            return
+
+        for image_hash in self.receipt_hashes.pop(receipt_id, []):
+            del self.hashes[image_hash]
+            for band in self._bands(image_hash):
+                hashes = self.hash_bands.get(band)
+                if hashes is not None:
+                    hashes.discard(image_hash)
+                    if not hashes:
+                        del self.hash_bands[band]
+
+    def find(
+        self,
+        date: str,
+        store_name: str,
+        total_amount,
+        items: list[dict],
+        image_hashes: list[str],
+    ) -> list[dict]:
+        matches: dict[str, dict] = {}
+
+        item_set = self._make_item_set(items)
+        key = self._make_key(date, store_name, total_amount)
+        for receipt_id in self.keys.get(key, ()):
+            similarity = item_similarity(item_set, self.receipts[receipt_id][1])
+            if similarity >= ITEM_SIMILARITY_THRESHOLD:
+                matches[receipt_id] = {
+                    "receipt_id": receipt_id,
+                    "reasons": ["same_date_store_total"],
+                    "item_similarity": round(similarity, 2),
+                    "confidence": "high",
+                }
+
+        for image_hash in filter(is_valid_hash, image_hashes):
+            value = int(image_hash, 16)
+            candidates = set()
+            for band in self._bands(image_hash):
+                candidates |= self.hash_bands.get(band, set())
+
+            for candidate in candidates:
+                if bin(value ^ int(candidate, 16)).count("1") > MAX_HAMMING_DISTANCE:
+                    continue
+                receipt_id = self.hashes[candidate]
+                match = matches.setdefault(
+                    receipt_id,
+                    {"receipt_id": receipt_id, "reasons": [], "confidence": "low"},
+                )
+                if "similar_image" not in match["reasons"]:
+                    match["reasons"].append("similar_image")
+
+                # 9x8 の dHash は粗く、白いレシートの写真同士は別物でも近くなりやすい。
+                # 日付か合計金額も一致するときだけ重複とみなし、画像だけなら弱い候補に留める
+                saved_date, _, saved_total = self.receipts.get(
+                    receipt_id, ((None, None, None), None)
+                )[0]
+                if (date is not None and saved_date == date) or (
+                    total_amount is not None and saved_total == total_amount
+                ):
+                    match["confidence"] = "high"
+
+        return list(matches.values())
+
+
+class DuplicateService:
+    def __init__(self):
+        # API を経由しない書き込み (取り込み CLI など) も一定時間で反映されるよう作り直す
+        self.ttl_seconds = int(os.environ.get("DUPLICATE_INDEX_TTL_SECONDS", "600"))
+        self._indexes: dict[str, UserReceiptIndex] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self, supabase_service) -> UserReceiptIndex:
+        user_id = supabase_service.user_id
+        with self._lock:
+            index = self._indexes.get(user_id)
+        if index is not None and time.monotonic() - index.loaded_at < self.ttl_seconds:
+            return index
+
+        # 読み込み中の書き込みを取りこぼしても次の TTL で作り直されるよう、開始時刻で記録する
+        loaded_at = time.monotonic()
+        index = UserReceiptIndex()
+        index.loaded_at = loaded_at
+        for row in supabase_service.get_receipt_fingerprints():
+            index.set_receipt(
+                str(row["id"]),
+                row.get("date"),
+                row.get("store_name"),
+                row.get("total_amount"),
+                row.get("receipt_items") or [],
+            )
+            index.add_image_hashes(str(row["id"]), row.get("image_hashes") or [])
+
+        with self._lock:
+            current = self._indexes.get(user_id)
+            if current is not None and current.loaded_at > index.loaded_at:
+                return current
+            self._indexes[user_id] = index
+            return index
+
+    def find_duplicates(
+        self,
+        supabase_service,
+        receipt: dict,
+        image_hashes: list[str],
+    ) -> list[dict]:
+        index = self._ensure_loaded(supabase_service)
+        with self._lock:
+            return index.find(
+                receipt.get("purchase_date"),
+                receipt.get("store_name"),
+                receipt.get("total_amount"),
+                receipt.get("items") or [],
+                image_hashes,
+            )
+
+    def record_receipt(
+        self,
+        user_id: str,
+        receipt_id: str,
+        date: str,
+        store_name: str,
+        total_amount,
+        items: list[dict],
+        image_hashes: list[str] | None = None,
+    ) -> None:
+        # 未ロードのユーザーは次回参照時に全件から構築されるので何もしない
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            index.set_receipt(str(receipt_id), date, store_name, total_amount, items)
+            if image_hashes:
+                index.add_image_hashes(str(receipt_id), image_hashes)
+
+    def remove_receipt(self, user_id: str, receipt_id: str) -> None:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.remove_receipt(str(receipt_id))
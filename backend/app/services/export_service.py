@@ -0,0 +1,207 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterator
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_TABLES = ("receipts", "receipt_items", "csv_transactions")
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Parquet の列型。ページごとの推論だと全 NULL の列で型が揺れるため、テーブルごとに固定する
+PARQUET_COLUMNS = {
+    "receipts": {
+        "id": "string",
+        "user_id": "string",
+        "date": "string",
+        "store_name": "string",
+        "total_amount": "int64",
+        "payment_method": "string",
+        "image_hashes": "list<string>",
+        "created_at": "string",
+    },
+    "receipt_items": {
+        "id": "string",
+        "receipt_id": "string",
+        "user_id": "string",
+        "item_name": "string",
+        "price": "int64",
+        "main_category": "string",
+        "sub_category": "string",
+        "search_tags": "list<string>",
+        "is_comparable": "bool",
+        "created_at": "string",
+    },
+    "csv_transactions": {
+        "id": "string",
+        "user_id": "string",
+        "date": "string",
+        "store": "string",
+        "price": "int64",
+        "created_at": "string",
+    },
+}
+
+
+def _arrow_type(type_name: str):
+    if type_name == "int64":
+        return pa.int64()
+    if type_name == "bool":
+        return pa.bool_()
+    if type_name == "list<string>":
+        return pa.list_(pa.string())
+    return pa.string()
+
+
+def _coerce(value, type_name: str):
+    # 型が合わない値でストリームの途中で失敗しないよう、変換できない値は NULL にする
+    if value is None:
+        return None
+    try:
+        if type_name == "int64":
+            return int(value)
+        if type_name == "bool":
+            return bool(value)
+        if type_name == "list<string>":
+            return [str(v) for v in value] if isinstance(value, list) else None
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class _ChunkSink:
+    # ParquetWriter の出力を溜めておき、ページごとに取り出すためのファイル風オブジェクト
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ExportService:
+    def __init__(self, page_size: int = 1000):
+        self.page_size = page_size
+
+    def validate(self, table: str, export_format: str) -> None:
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unsupported table: {table}")
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format: {export_format}")
+        if export_format == "parquet" and pa is None:
+            raise ValueError("Parquet export requires pyarrow to be installed.")
+
+    def media_type(self, export_format: str, compress: bool) -> str:
+        if compress and export_format != "parquet":
+            return "application/gzip"
+        return EXPORT_FORMATS[export_format][0]
+
+    def filename(self, table: str, export_format: str, compress: bool) -> str:
+        name = f"{table}.{EXPORT_FORMATS[export_format][1]}"
+        if compress and export_format != "parquet":
+            name += ".gz"
+        return name
+
+    def stream(
+        self, supabase_service, table: str, export_format: str, compress: bool
+    ) -> Iterator[bytes]:
+        pages = supabase_service.iter_table_pages(table, self.page_size)
+
+        if export_format == "parquet":
+            # Parquet は列チャンク単位で gzip 圧縮されるので外側では圧縮しない
+            yield from self._stream_parquet(table, pages, compress)
+            return
+
+        if export_format == "csv":
+            chunks = self._stream_csv(pages)
+        else:
+            chunks = self._stream_jsonl(pages)
+
+        if not compress:
+            yield from chunks
+            return
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            # ページごとに同期フラッシュしてクライアントへ即座に届ける
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+    def _stream_csv(self, pages: Iterator[list[dict]]) -> Iterator[bytes]:
+        columns = None
+        for rows in pages:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if columns is None:
+                columns = list(rows[0].keys())
+                writer.writerow(columns)
+            for row in rows:
+                writer.writerow([self._to_csv_value(row.get(c)) for c in columns])
+            yield buffer.getvalue().encode("utf-8")
+
+    def _to_csv_value(self, value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, ensure_ascii=False)
+        return str(value)
+
+    def _stream_jsonl(self, pages: Iterator[list[dict]]) -> Iterator[bytes]:
+        for rows in pages:
+            lines = [json.dumps(row, ensure_ascii=False) for row in rows]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _stream_parquet(
+        self, table: str, pages: Iterator[list[dict]], compress: bool
+    ) -> Iterator[bytes]:
+        columns = PARQUET_COLUMNS[table]
+        schema = pa.schema(
+            [(name, _arrow_type(type_name)) for name, type_name in columns.items()]
+        )
+
+        # 0 件でもスキーマだけを持つ有効な Parquet ファイルを返す
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(
+            sink, schema, compression="gzip" if compress else "none"
+        )
+        try:
+            for rows in pages:
+                data = {
+                    name: [_coerce(row.get(name), type_name) for row in rows]
+                    for name, type_name in columns.items()
+                }
+                writer.write_table(pa.Table.from_pydict(data, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+
+        yield sink.drain()
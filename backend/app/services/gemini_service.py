@@ -3,7 +3,7 @@ import json
 import os
 
 from app.schemas.csv import CsvMapping
-from app.schemas.receipt import ReceiptDatas
+from app.schemas.receipt import ItemLabels, LeanReceiptDatas, ReceiptDatas
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
@@ -17,10 +17,27 @@ class GeminiService:
         self.client = genai.Client(api_key=api_key)
 
     def analyze_receipt(self, image_bytes_list: list[bytes]) -> dict:
+        result, _ = self.analyze_receipt_with_usage(image_bytes_list)
+        return result
+
+    def analyze_receipt_with_usage(
+        self, image_bytes_list: list[bytes]
+    ) -> tuple[dict, dict]:
+        return self._extract_receipts(image_bytes_list, ReceiptDatas)
+
+    def analyze_receipt_lean_with_usage(
+        self, image_bytes_list: list[bytes]
+    ) -> tuple[dict, dict]:
+        # 品名と価格だけを出力させ、カテゴリ等はローカル分類器で補完する
+        return self._extract_receipts(image_bytes_list, LeanReceiptDatas)
+
+    def _extract_receipts(
+        self, image_bytes_list: list[bytes], response_schema: type
+    ) -> tuple[dict, dict]:
         config = types.GenerateContentConfig(
             temperature=0.0,
             response_mime_type="application/json",
-            response_schema=ReceiptDatas,
+            response_schema=response_schema,
             thinking_config=types.ThinkingConfig(
                 thinking_level=types.ThinkingLevel.LOW
             ),
@@ -44,15 +61,48 @@ class GeminiService:
                 contents=contents,
                 config=config,
             )
-            return json.loads(response.text)
+            return json.loads(response.text), self._get_usage(response)
         except Exception as e:
             print(f"Error during Gemini API call: {e}")
             raise e
 
+    def classify_items_with_usage(self, item_names: list[str]) -> tuple[dict, dict]:
+        prompt = "Classify each receipt item name according to the schema. Return one entry per input name."
+
+        try:
+            response = self.client.models.generate_content(
+                model="gemini-3-flash-preview",
+                contents=[prompt, "Item names:\n" + "\n".join(item_names)],
+                config=types.GenerateContentConfig(
+                    temperature=0.0,
+                    response_mime_type="application/json",
+                    response_schema=ItemLabels,
+                    thinking_config=types.ThinkingConfig(
+                        thinking_level=types.ThinkingLevel.LOW
+                    ),
+                ),
+            )
+            return json.loads(response.text), self._get_usage(response)
+        except Exception as e:
+            print(f"Gemini Item Classification Error: {e}")
+            raise e
+
+    def _get_usage(self, response) -> dict:
+        usage = response.usage_metadata
+        return {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+            "response_tokens": getattr(usage, "candidates_token_count", None) or 0,
+            "total_tokens": getattr(usage, "total_token_count", None) or 0,
+        }
+
     def answer_question(self, question: str, context_data: str) -> str:
+        answer, _ = self.answer_question_with_usage(question, context_data)
+        return answer
+
+    def _answer_instruction(self) -> str:
         today = datetime.date.today().strftime("%Y-%m-%d")
 
-        prompt = f"""
+        return f"""
         You are a dedicated personal household account book assistant.
         Please answer the user's question based strictly on the following receipt data (CSV format).
 
@@ -62,12 +112,23 @@ class GeminiService:
         - If the information is not present in the data, strictly answer with "分かりません" (I don't know).
         - Respond in a friendly and polite Japanese tone. Use conversational endings such as "～ですね" or "～ですよ".
         - NEVER use Markdown `**` for emphasis in your response. If you want to emphasize a specific word, you MUST use the HTML `<b>` tag instead.
+        """
 
+    def _answer_context(self, context_data: str) -> str:
+        return f"""
         # Receipt Data
         Format: Purchase Date, Item Name, Store Name, Amount
         ---
         {context_data}
         ---
+        """
+
+    def answer_question_with_usage(
+        self, question: str, context_data: str
+    ) -> tuple[str, dict]:
+        prompt = f"""
+        {self._answer_instruction()}
+        {self._answer_context(context_data)}
 
         # User's Question
         {question}
@@ -84,12 +145,96 @@ class GeminiService:
                     ),
                 ),
             )
-            return response.text
+            return response.text, self._get_usage(response)
+        except Exception as e:
+            print(f"Error during Gemini API call: {e}")
+            raise e
+
+    def create_answer_cache_with_usage(
+        self, context_data: str, ttl_seconds: int
+    ) -> tuple[str, dict]:
+        try:
+            cache = self.client.caches.create(
+                model="gemini-3-flash-preview",
+                config=types.CreateCachedContentConfig(
+                    system_instruction=self._answer_instruction(),
+                    contents=[
+                        types.Content(
+                            role="user",
+                            parts=[types.Part(text=self._answer_context(context_data))],
+                        )
+                    ],
+                    ttl=f"{ttl_seconds}s",
+                ),
+            )
+            return cache.name, self._get_usage(cache)
+        except Exception as e:
+            print(f"Gemini Context Cache Error: {e}")
+            raise e
+
+    def delete_answer_cache(self, cache_name: str) -> None:
+        try:
+            self.client.caches.delete(name=cache_name)
+        except Exception as e:
+            # 削除に失敗しても TTL で失効するので、ログだけ残す
+            print(f"Gemini Context Cache Delete Error: {e}")
+
+    def answer_in_session_with_usage(
+        self,
+        question: str,
+        history: list[tuple[str, str]],
+        context_data: str,
+        cache_name: str | None,
+    ) -> tuple[str, dict]:
+        contents = []
+        if cache_name:
+            config = types.GenerateContentConfig(
+                temperature=0.0,
+                cached_content=cache_name,
+                thinking_config=types.ThinkingConfig(
+                    thinking_level=types.ThinkingLevel.LOW
+                ),
+            )
+        else:
+            config = types.GenerateContentConfig(
+                temperature=0.0,
+                system_instruction=self._answer_instruction(),
+                thinking_config=types.ThinkingConfig(
+                    thinking_level=types.ThinkingLevel.LOW
+                ),
+            )
+            contents.append(
+                types.Content(
+                    role="user",
+                    parts=[types.Part(text=self._answer_context(context_data))],
+                )
+            )
+
+        for past_question, past_answer in history:
+            contents.append(
+                types.Content(role="user", parts=[types.Part(text=past_question)])
+            )
+            contents.append(
+                types.Content(role="model", parts=[types.Part(text=past_answer)])
+            )
+        contents.append(types.Content(role="user", parts=[types.Part(text=question)]))
+
+        try:
+            response = self.client.models.generate_content(
+                model="gemini-3-flash-preview",
+                contents=contents,
+                config=config,
+            )
+            return response.text, self._get_usage(response)
         except Exception as e:
             print(f"Error during Gemini API call: {e}")
             raise e
 
     def analyze_csv(self, csv_sample: str) -> dict:
+        mapping, _ = self.analyze_csv_with_usage(csv_sample)
+        return mapping
+
+    def analyze_csv_with_usage(self, csv_sample: str) -> tuple[dict, dict]:
         prompt = "Analyze the provided CSV sample lines and determine the column indices according to the schema."
 
         try:
@@ -106,7 +251,7 @@ class GeminiService:
                 ),
             )
 
-            return json.loads(response.text)
+            return json.loads(response.text), self._get_usage(response)
 
         except Exception as e:
             print(f"Gemini CSV Mapping Error: {e}")
@@ -0,0 +1,237 @@
+import math
+import threading
+from collections import Counter
+
+from app.utils.text import normalize_item_name
+
+CONFIDENCE_THRESHOLD = 0.85
+MIN_KNOWN_FEATURE_RATIO = 0.5
+MAX_SEARCH_TAGS = 5
+
+
+def extract_features(normalized_name: str) -> list[str]:
+    # 日本語の品名は単語区切りが無いため、文字 2-gram / 3-gram を特徴量にする
+    text = f"^{normalized_name.replace(' ', '')}$"
+    return [text[i : i + n] for n in (2, 3) for i in range(len(text) - n + 1)]
+
+
+class ItemClassifier:
+    def __init__(self, exact_match: bool = True):
+        # 全ユーザー横断のモデルでは他人の品名をそのまま引けないよう完全一致を持たない
+        self.exact_match = exact_match
+        self.exact: dict[str, dict] = {}
+        self.label_counts: Counter[tuple[str, str]] = Counter()
+        self.feature_counts: dict[tuple[str, str], Counter[str]] = {}
+        self.feature_totals: Counter[tuple[str, str]] = Counter()
+        self.label_tags: dict[tuple[str, str], Counter[str]] = {}
+        self.vocabulary: set[str] = set()
+
+    def add(self, row: dict, replace_exact: bool = False) -> None:
+        name = normalize_item_name(row.get("item_name", ""))
+        main_category = row.get("main_category")
+        sub_category = row.get("sub_category")
+        if not name or not main_category or not sub_category:
+            return
+
+        label = (main_category, sub_category)
+        tags = row.get("search_tags") or []
+        if self.exact_match and (replace_exact or name not in self.exact):
+            self.exact[name] = {
+                "main_category": main_category,
+                "sub_category": sub_category,
+                "search_tags": tags,
+            }
+
+        features = extract_features(name)
+        self.label_counts[label] += 1
+        self.feature_counts.setdefault(label, Counter()).update(features)
+        self.feature_totals[label] += len(features)
+        self.label_tags.setdefault(label, Counter()).update(tags)
+        self.vocabulary.update(features)
+
+    def predict(self, item_name: str) -> tuple[dict | None, float]:
+        name = normalize_item_name(item_name)
+        if name in self.exact:
+            return self.exact[name], 1.0
+
+        features = extract_features(name)
+        if not features or not self.label_counts:
+            return None, 0.0
+
+        known = sum(1 for f in features if f in self.vocabulary)
+        if known / len(features) < MIN_KNOWN_FEATURE_RATIO:
+            return None, 0.0
+
+        # 多項ナイーブベイズ (ラプラス平滑化) の事後確率
+        total_labels = sum(self.label_counts.values())
+        vocabulary_size = len(self.vocabulary) + 1
+        scores = {}
+        for label, label_count in self.label_counts.items():
+            counts = self.feature_counts[label]
+            denominator = self.feature_totals[label] + vocabulary_size
+            score = math.log(label_count / total_labels)
+            for feature in features:
+                score += math.log((counts[feature] + 1) / denominator)
+            scores[label] = score
+
+        best_label = max(scores, key=scores.get)
+        best_score = scores[best_label]
+        normalizer = sum(math.exp(s - best_score) for s in scores.values())
+        confidence = 1.0 / normalizer
+
+        tags = [
+            tag for tag, _ in self.label_tags[best_label].most_common(MAX_SEARCH_TAGS)
+        ]
+        return (
+            {
+                "main_category": best_label[0],
+                "sub_category": best_label[1],
+                "search_tags": tags,
+            },
+            confidence,
+        )
+
+
+class ExtractionStats:
+    def __init__(self):
+        self.modes: dict[str, Counter[str]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode: str, metrics: dict) -> None:
+        with self._lock:
+            totals = self.modes.setdefault(mode, Counter())
+            totals["requests"] += 1
+            for key in (
+                "prompt_tokens",
+                "response_tokens",
+                "latency_ms",
+                "items_total",
+                "items_classified_locally",
+            ):
+                totals[key] += metrics.get(key, 0)
+
+    def summary(self) -> dict:
+        with self._lock:
+            averages = {
+                mode: {
+                    "requests": totals["requests"],
+                    "avg_prompt_tokens": round(
+                        totals["prompt_tokens"] / totals["requests"]
+                    ),
+                    "avg_response_tokens": round(
+                        totals["response_tokens"] / totals["requests"]
+                    ),
+                    "avg_latency_ms": round(totals["latency_ms"] / totals["requests"]),
+                    "avg_response_tokens_per_item": round(
+                        totals["response_tokens"] / totals["items_total"], 1
+                    )
+                    if totals["items_total"]
+                    else None,
+                    "local_classification_rate": round(
+                        totals["items_classified_locally"] / totals["items_total"], 2
+                    )
+                    if totals["items_total"]
+                    else None,
+                }
+                for mode, totals in self.modes.items()
+            }
+
+        full = averages.get("full")
+        lean = averages.get("lean")
+        reduction = None
+        if (
+            full
+            and lean
+            and full["avg_response_tokens_per_item"]
+            and full["avg_latency_ms"]
+        ):
+            reduction = {
+                "response_tokens_per_item": round(
+                    1
+                    - (lean["avg_response_tokens_per_item"] or 0)
+                    / full["avg_response_tokens_per_item"],
+                    2,
+                ),
+                "latency": round(
+                    1 - lean["avg_latency_ms"] / full["avg_latency_ms"], 2
+                ),
+            }
+
+        return {"modes": averages, "reduction": reduction}
+
+
+class ItemClassifierService:
+    def __init__(self):
+        self._users: dict[str, ItemClassifier] = {}
+        self._global: ItemClassifier | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_global(self, supabase_service) -> ItemClassifier:
+        with self._lock:
+            if self._global is not None:
+                return self._global
+
+        classifier = ItemClassifier(exact_match=False)
+        for row in supabase_service.get_global_labeled_items():
+            # 検索タグは本人のラベルからのみ学習する
+            classifier.add({**row, "search_tags": []})
+
+        with self._lock:
+            if self._global is None:
+                self._global = classifier
+            return self._global
+
+    def _ensure_user(self, supabase_service) -> ItemClassifier:
+        user_id = supabase_service.user_id
+        with self._lock:
+            classifier = self._users.get(user_id)
+        if classifier is not None:
+            return classifier
+
+        classifier = ItemClassifier()
+        for row in supabase_service.get_labeled_items():
+            classifier.add(row)
+
+        with self._lock:
+            return self._users.setdefault(user_id, classifier)
+
+    def classify(self, supabase_service, receipts: list[dict]) -> list[dict]:
+        # 自信のある品目はその場でラベルを埋め、残りの品目を返す
+        user_classifier = self._ensure_user(supabase_service)
+        global_classifier = self._ensure_global(supabase_service)
+
+        uncertain = []
+        with self._lock:
+            for receipt in receipts:
+                for item in receipt.get("items", []):
+                    label, confidence = user_classifier.predict(item["item_name"])
+                    if confidence < CONFIDENCE_THRESHOLD:
+                        global_label, global_confidence = global_classifier.predict(
+                            item["item_name"]
+                        )
+                        if global_confidence > confidence:
+                            label, confidence = global_label, global_confidence
+
+                    item["is_comparable"] = True
+                    if label is not None and confidence >= CONFIDENCE_THRESHOLD:
+                        item.update(label)
+                    else:
+                        uncertain.append(item)
+
+        return uncertain
+
+    def apply_model_labels(self, items: list[dict], labels: list[dict]) -> None:
+        by_name = {label["item_name"]: label for label in labels}
+        for item in items:
+            label = by_name.get(item["item_name"], {})
+            item["main_category"] = label.get("main_category", "その他")
+            item["sub_category"] = label.get("sub_category", "")
+            item["search_tags"] = label.get("search_tags", [])
+
+    def learn(self, user_id: str, items: list[dict]) -> None:
+        # 未ロードのユーザーは次回参照時に全件から構築されるので何もしない
+        with self._lock:
+            classifier = self._users.get(user_id)
+            if classifier is not None:
+                for item in items:
+                    classifier.add(item, replace_exact=True)
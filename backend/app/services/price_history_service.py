@@ -0,0 +1,293 @@
+import bisect
+import datetime
+import os
+import threading
+import time
+
+from app.utils.text import (
+    build_search_groups,
+    matches_search_groups,
+    normalize_item_name,
+)
+
+
+class PriceStats:
+    def __init__(self):
+        # (date, receipt_id, price) を日付順に保持する
+        self.points: list[tuple[str, str, int]] = []
+        self.total = 0
+        self.min_price: int | None = None
+
+    def add(self, date: str, receipt_id: str, price: int) -> None:
+        bisect.insort(self.points, (date, receipt_id, price))
+        self.total += price
+        if self.min_price is None or price < self.min_price:
+            self.min_price = price
+
+    def remove(self, date: str, receipt_id: str, price: int) -> None:
+        index = bisect.bisect_left(self.points, (date, receipt_id, price))
+        if index >= len(self.points) or self.points[index] != (
+            date,
+            receipt_id,
+            price,
+        ):
+            return
+
+        del self.points[index]
+        self.total -= price
+        if price == self.min_price:
+            self.min_price = min((p[2] for p in self.points), default=None)
+
+    def summary(self) -> dict:
+        count = len(self.points)
+        last = self.points[-1] if self.points else None
+        return {
+            "count": count,
+            "min_price": self.min_price,
+            "avg_price": round(self.total / count) if count else None,
+            "last_price": last[2] if last else None,
+            "last_date": last[0] if last else None,
+        }
+
+
+class ItemPriceSeries:
+    def __init__(self, item_name: str):
+        self.item_name = item_name
+        self.search_tags: list[str] = []
+        self.overall = PriceStats()
+        self.stores: dict[str, PriceStats] = {}
+
+    def add(self, point: dict) -> None:
+        self.overall.add(point["date"], point["receipt_id"], point["price"])
+        store = self.stores.setdefault(point["store_name"], PriceStats())
+        store.add(point["date"], point["receipt_id"], point["price"])
+
+    def remove(self, point: dict) -> None:
+        self.overall.remove(point["date"], point["receipt_id"], point["price"])
+        store = self.stores.get(point["store_name"])
+        if store is not None:
+            store.remove(point["date"], point["receipt_id"], point["price"])
+            if not store.points:
+                del self.stores[point["store_name"]]
+
+    def is_empty(self) -> bool:
+        return not self.overall.points
+
+    def downsample(self, max_points: int) -> list[dict]:
+        points = self.overall.points
+        if not points:
+            return []
+
+        # 期間を max_points 個の等間隔バケットに分割し、各バケットを集約して返す
+        first = datetime.date.fromisoformat(points[0][0])
+        last = datetime.date.fromisoformat(points[-1][0])
+        span_days = (last - first).days + 1
+        bucket_days = max(1, -(-span_days // max(1, max_points)))
+
+        series = []
+        bucket_index = None
+        for date, receipt_id, price in points:
+            index = (datetime.date.fromisoformat(date) - first).days // bucket_days
+            if index != bucket_index:
+                bucket_index = index
+                series.append(
+                    {
+                        "date": date,
+                        "min_price": price,
+                        "avg_price": 0,
+                        "last_price": price,
+                        "last_receipt_id": receipt_id,
+                        "count": 0,
+                    }
+                )
+            bucket = series[-1]
+            bucket["min_price"] = min(bucket["min_price"], price)
+            bucket["last_price"] = price
+            bucket["last_receipt_id"] = receipt_id
+            bucket["avg_price"] += price
+            bucket["count"] += 1
+
+        for bucket in series:
+            bucket["avg_price"] = round(bucket["avg_price"] / bucket["count"])
+
+        return series
+
+    def recent(self, limit: int) -> list[dict]:
+        # 店舗別の系列に店舗名があるので、各店舗の末尾から新しい順に集める
+        if limit <= 0:
+            return []
+        purchases = [
+            {
+                "date": date,
+                "receipt_id": receipt_id,
+                "store_name": store_name,
+                "price": price,
+            }
+            for store_name, stats in self.stores.items()
+            for date, receipt_id, price in stats.points[-limit:]
+        ]
+        purchases.sort(key=lambda p: (p["date"], p["receipt_id"]))
+        return purchases[-limit:]
+
+
+class UserPriceHistory:
+    def __init__(self):
+        self.loaded_at = time.monotonic()
+        self.items: dict[str, ItemPriceSeries] = {}
+        self.receipt_points: dict[str, list[tuple[str, dict]]] = {}
+
+    def set_receipt(
+        self, receipt_id: str, date: str, store_name: str, items: list[dict]
+    ) -> None:
+        self.remove_receipt(receipt_id)
+
+        try:
+            datetime.date.fromisoformat(date)
+        except (TypeError, ValueError):
+            return
+
+        entries = []
+        for item in items:
+            if not item.get("is_comparable", True) or item.get("price") is None:
+                continue
+            key = normalize_item_name(item.get("item_name", ""))
+            if not key:
+                continue
+
+            point = {
+                "date": date,
+                "receipt_id": receipt_id,
+                "store_name": store_name or "",
+                "price": int(item["price"]),
+            }
+            series = self.items.get(key)
+            if series is None:
+                series = ItemPriceSeries(item["item_name"])
+                self.items[key] = series
+            series.add(point)
+
+            # 最新の購入に合わせて表示名とタグを更新する
+            if series.overall.points[-1][1] == receipt_id:
+                series.item_name = item["item_name"]
+                series.search_tags = item.get("search_tags") or series.search_tags
+
+            entries.append((key, point))
+
+        if entries:
+            self.receipt_points[receipt_id] = entries
+
+    def remove_receipt(self, receipt_id: str) -> None:
+        for key, point in self.receipt_points.pop(receipt_id, []):
+            series = self.items.get(key)
+            if series is None:
+                continue
+            series.remove(point)
+            if series.is_empty():
+                del self.items[key]
+
+
+class PriceHistoryService:
+    def __init__(self):
+        # API を経由しない書き込み (取り込み CLI など) も一定時間で反映されるよう作り直す
+        self.ttl_seconds = int(os.environ.get("PRICE_HISTORY_TTL_SECONDS", "600"))
+        self._histories: dict[str, UserPriceHistory] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self, supabase_service) -> UserPriceHistory:
+        user_id = supabase_service.user_id
+        with self._lock:
+            history = self._histories.get(user_id)
+        if (
+            history is not None
+            and time.monotonic() - history.loaded_at < self.ttl_seconds
+        ):
+            return history
+
+        # 読み込み中の書き込みを取りこぼしても次の TTL で作り直されるよう、開始時刻で記録する
+        loaded_at = time.monotonic()
+        rows = supabase_service.get_comparable_items()
+
+        receipts: dict[str, dict] = {}
+        for row in rows:
+            parent = row.get("receipts") or {}
+            receipt = receipts.setdefault(
+                str(row["receipt_id"]),
+                {
+                    "date": parent.get("date"),
+                    "store_name": parent.get("store_name"),
+                    "items": [],
+                },
+            )
+            receipt["items"].append(row)
+
+        history = UserPriceHistory()
+        history.loaded_at = loaded_at
+        for receipt_id, receipt in receipts.items():
+            history.set_receipt(
+                receipt_id, receipt["date"], receipt["store_name"], receipt["items"]
+            )
+
+        with self._lock:
+            current = self._histories.get(user_id)
+            if current is not None and current.loaded_at > history.loaded_at:
+                return current
+            self._histories[user_id] = history
+            return history
+
+    def record_receipt(
+        self,
+        user_id: str,
+        receipt_id: str,
+        date: str,
+        store_name: str,
+        items: list[dict],
+    ) -> None:
+        # 未ロードのユーザーは次回参照時に全件から構築されるので何もしない
+        with self._lock:
+            history = self._histories.get(user_id)
+            if history is not None:
+                history.set_receipt(str(receipt_id), date, store_name, items)
+
+    def remove_receipt(self, user_id: str, receipt_id: str) -> None:
+        with self._lock:
+            history = self._histories.get(user_id)
+            if history is not None:
+                history.remove_receipt(str(receipt_id))
+
+    def get_price_trends(
+        self,
+        supabase_service,
+        query: str,
+        max_points: int = 60,
+        max_recent: int = 30,
+    ) -> list[dict]:
+        search_groups = build_search_groups(query)
+        if not search_groups:
+            return []
+
+        history = self._ensure_loaded(supabase_service)
+
+        results = []
+        with self._lock:
+            for key, series in history.items.items():
+                tags_str = " ".join(series.search_tags).lower()
+                target_text = f"{series.item_name.lower()} {key} {tags_str}"
+                if not matches_search_groups(target_text, search_groups):
+                    continue
+
+                results.append(
+                    {
+                        "key": key,
+                        "item_name": series.item_name,
+                        "stats": series.overall.summary(),
+                        "stores": [
+                            {"store_name": store_name, **stats.summary()}
+                            for store_name, stats in sorted(series.stores.items())
+                        ],
+                        "series": series.downsample(max_points),
+                        "recent": series.recent(max_recent),
+                    }
+                )
+
+        results.sort(key=lambda r: r["stats"]["last_date"] or "", reverse=True)
+        return results
@@ -1,15 +1,25 @@
 import calendar
 import datetime
 import os
-import unicodedata
+import threading
+import time
+from collections.abc import Callable, Iterator
 
 from app.schemas.csv import ParsedCsvTransaction
+from app.schemas.history import CsvTransactionUpdate, ReceiptUpdate
 from app.schemas.receipt import ReceiptData
-from supabase import Client, create_client
+from app.utils.text import build_search_groups, matches_search_groups
+from supabase import Client, ClientOptions, create_client
+
+BULK_CHUNK_SIZE = 100
+# PostgREST の既定 max-rows と同じ。これを超える件数は 1 回の select では返らない
+PAGE_SIZE = 1000
+# アクセストークンの期限がこれより近ければ、次の呼び出し前に更新する
+SESSION_REFRESH_MARGIN_SECONDS = 300
 
 
 class SupabaseService:
-    def __init__(self, token: str):
+    def __init__(self, token: str | None = None, refresh_token: str | None = None):
         url = os.environ.get("VITE_SUPABASE_URL") or os.environ.get("SUPABASE_URL")
         key = os.environ.get("VITE_SUPABASE_PUBLISHABLE_KEY") or os.environ.get(
             "SUPABASE_KEY"
@@ -20,7 +30,19 @@ class SupabaseService:
                 "Supabase URL and Key must be set in environment variables."
             )
 
-        self.client: Client = create_client(url, key)
+        # 自動更新のタイマーは非 daemon スレッドで終了を妨げるため、更新は
+        # ensure_fresh_session で明示的に行う
+        self.client: Client = create_client(
+            url, key, ClientOptions(auto_refresh_token=False)
+        )
+        self.refresh_token = refresh_token
+        self.expires_at: int | None = None
+        self._refresh_lock = threading.Lock()
+
+        if refresh_token:
+            token = self._refresh_session()
+        if not token:
+            raise ValueError("Supabase token must be provided.")
 
         self.client.options.headers.update({"Authorization": f"Bearer {token}"})
 
@@ -29,6 +51,27 @@ class SupabaseService:
             raise ValueError("Invalid Supabase token provided.")
         self.user_id = user_response.user.id
 
+    def _refresh_session(self) -> str:
+        session = self.client.auth.refresh_session(self.refresh_token).session
+        if session is None:
+            raise ValueError("Failed to refresh the Supabase session.")
+        # リフレッシュトークンは使うたびに新しくなる。クライアントの Authorization は
+        # TOKEN_REFRESHED イベントで差し替わる
+        self.refresh_token = session.refresh_token
+        self.expires_at = session.expires_at
+        return session.access_token
+
+    def ensure_fresh_session(self) -> None:
+        # 取り込み CLI のような長時間の処理向け。リフレッシュトークンがなければ何もしない
+        if not self.refresh_token:
+            return
+        with self._refresh_lock:
+            if (
+                self.expires_at is None
+                or time.time() > self.expires_at - SESSION_REFRESH_MARGIN_SECONDS
+            ):
+                self._refresh_session()
+
     def add_receipt_data(self, receipt: ReceiptData) -> dict:
         parent_data = {
             "user_id": self.user_id,
@@ -36,6 +79,7 @@ class SupabaseService:
             "store_name": receipt.store_name,
             "total_amount": receipt.total_amount,
             "payment_method": receipt.payment_method,
+            "image_hashes": getattr(receipt, "image_hashes", None) or [],
         }
 
         parent_response = self.client.table("receipts").insert(parent_data).execute()
@@ -72,6 +116,60 @@ class SupabaseService:
             "saved_items": items_count,
         }
 
+    def add_receipts_bulk(self, receipts: list[ReceiptData]) -> list[dict]:
+        if not receipts:
+            return []
+
+        parent_data = [
+            {
+                "user_id": self.user_id,
+                "date": receipt.purchase_date,
+                "store_name": receipt.store_name,
+                "total_amount": receipt.total_amount,
+                "payment_method": receipt.payment_method,
+                "image_hashes": getattr(receipt, "image_hashes", None) or [],
+            }
+            for receipt in receipts
+        ]
+
+        parent_response = self.client.table("receipts").insert(parent_data).execute()
+
+        if len(parent_response.data or []) != len(receipts):
+            raise Exception("親レシートの一括保存に失敗しました。")
+
+        items_data = []
+        for receipt, parent in zip(receipts, parent_response.data):
+            for item in receipt.items:
+                items_data.append(
+                    {
+                        "receipt_id": parent["id"],
+                        "user_id": self.user_id,
+                        "item_name": item.item_name,
+                        "price": item.price,
+                        "main_category": getattr(item, "main_category", None),
+                        "sub_category": getattr(item, "sub_category", None),
+                        "search_tags": getattr(item, "search_tags", None),
+                        "is_comparable": getattr(item, "is_comparable", None),
+                    }
+                )
+
+        if items_data:
+            try:
+                self.client.table("receipt_items").insert(items_data).execute()
+            except Exception:
+                # 明細の無い親レシートが残ると再開時に二重登録されるので取り消す
+                parent_ids = [parent["id"] for parent in parent_response.data]
+                for chunk in self._chunks(parent_ids):
+                    self.client.table("receipts").delete().in_("id", chunk).eq(
+                        "user_id", self.user_id
+                    ).execute()
+                raise
+
+        return [
+            {"receipt_id": parent["id"], "saved_items": len(receipt.items)}
+            for receipt, parent in zip(receipts, parent_response.data)
+        ]
+
     def add_csv_data(self, transactions: list[ParsedCsvTransaction]) -> dict:
         data = [
             {
@@ -99,25 +197,29 @@ class SupabaseService:
             "receipt_id", receipt_id
         ).execute()
 
-        items = receipt_data.get("receipt_items", [])
-        if items:
-            items_data = [
-                {
-                    "receipt_id": receipt_id,
-                    "user_id": self.user_id,
-                    "item_name": item.get("item_name"),
-                    "price": item.get("price"),
-                    "main_category": item.get("main_category"),
-                    "sub_category": item.get("sub_category"),
-                    "search_tags": item.get("search_tags"),
-                    "is_comparable": item.get("is_comparable", True),
-                }
-                for item in items
-            ]
+        items_data = self._build_item_rows(
+            receipt_id, receipt_data.get("receipt_items", [])
+        )
+        if items_data:
             self.client.table("receipt_items").insert(items_data).execute()
 
         return {"status": "success", "updated_id": receipt_id}
 
+    def _build_item_rows(self, receipt_id: str, items: list[dict]) -> list[dict]:
+        return [
+            {
+                "receipt_id": receipt_id,
+                "user_id": self.user_id,
+                "item_name": item.get("item_name"),
+                "price": item.get("price"),
+                "main_category": item.get("main_category"),
+                "sub_category": item.get("sub_category"),
+                "search_tags": item.get("search_tags"),
+                "is_comparable": item.get("is_comparable", True),
+            }
+            for item in items or []
+        ]
+
     def update_csv_transaction(self, transaction_id: str, csv_data: dict) -> dict:
         update_data = {
             "date": csv_data.get("date"),
@@ -146,6 +248,152 @@ class SupabaseService:
             "details": response.data,
         }
 
+    def _chunks(self, values: list, size: int = BULK_CHUNK_SIZE) -> Iterator[list]:
+        for i in range(0, len(values), size):
+            yield values[i : i + size]
+
+    def _existing_ids(self, table: str, ids: list[str]) -> set[str]:
+        response = (
+            self.client.table(table)
+            .select("id")
+            .in_("id", ids)
+            .eq("user_id", self.user_id)
+            .execute()
+        )
+        return {str(row["id"]) for row in response.data or []}
+
+    def _delete_many(self, table: str, ids: list[str]) -> list[dict]:
+        results = []
+        for chunk in self._chunks(ids):
+            try:
+                response = (
+                    self.client.table(table)
+                    .delete()
+                    .in_("id", chunk)
+                    .eq("user_id", self.user_id)
+                    .execute()
+                )
+            except Exception as e:
+                results.extend(
+                    {"id": i, "status": "error", "error": str(e)} for i in chunk
+                )
+                continue
+
+            deleted = {str(row["id"]) for row in response.data or []}
+            results.extend(
+                {"id": i, "status": "deleted" if i in deleted else "not_found"}
+                for i in chunk
+            )
+        return results
+
+    def delete_receipts(self, receipt_ids: list[str]) -> list[dict]:
+        return self._delete_many("receipts", receipt_ids)
+
+    def delete_csv_transactions(self, transaction_ids: list[str]) -> list[dict]:
+        return self._delete_many("csv_transactions", transaction_ids)
+
+    def update_csv_transactions(
+        self, updates: list[CsvTransactionUpdate]
+    ) -> list[dict]:
+        # 同じ id が 1 回の upsert に重複すると失敗するので、後勝ちで 1 件にまとめる
+        updates = list({u.id: u for u in updates}.values())
+        results = []
+        for chunk in self._chunks(updates):
+            ids = [u.id for u in chunk]
+            try:
+                existing = self._existing_ids("csv_transactions", ids)
+                rows = [
+                    {
+                        "id": u.id,
+                        "user_id": self.user_id,
+                        "date": u.date,
+                        "store": u.store,
+                        "price": u.price,
+                    }
+                    for u in chunk
+                    if u.id in existing
+                ]
+                if rows:
+                    self.client.table("csv_transactions").upsert(rows).execute()
+            except Exception as e:
+                results.extend(
+                    {"id": i, "status": "error", "error": str(e)} for i in ids
+                )
+                continue
+
+            results.extend(
+                {"id": i, "status": "updated" if i in existing else "not_found"}
+                for i in ids
+            )
+        return results
+
+    def update_receipts(self, receipts: list[ReceiptUpdate]) -> list[dict]:
+        receipts = list({r.id: r for r in receipts}.values())
+        results = []
+        for chunk in self._chunks(receipts):
+            ids = [r.id for r in chunk]
+            try:
+                existing = self._existing_ids("receipts", ids)
+                targets = [r for r in chunk if r.id in existing]
+                if targets:
+                    self._replace_receipts(targets)
+            except Exception as e:
+                results.extend(
+                    {"id": i, "status": "error", "error": str(e)} for i in ids
+                )
+                continue
+
+            results.extend(
+                {"id": i, "status": "updated" if i in existing else "not_found"}
+                for i in ids
+            )
+        return results
+
+    def _replace_receipts(self, targets: list[ReceiptUpdate]) -> None:
+        # 新しい明細を先に入れてから古い明細を消し、途中で失敗しても
+        # 明細が空のレシートが残らないようにする
+        target_ids = [r.id for r in targets]
+        # 1 レシートあたりの明細数が多いと 1 回の select では上限で切れるのでページングする
+        old_item_ids = [
+            row["id"]
+            for page in self.iter_table_pages(
+                "receipt_items",
+                columns="id",
+                where=lambda q: q.in_("receipt_id", target_ids),
+            )
+            for row in page
+        ]
+
+        items_data = [
+            row for r in targets for row in self._build_item_rows(r.id, r.receipt_items)
+        ]
+        new_item_ids = []
+        if items_data:
+            response = self.client.table("receipt_items").insert(items_data).execute()
+            new_item_ids = [row["id"] for row in response.data or []]
+
+        try:
+            parent_rows = [
+                {
+                    "id": r.id,
+                    "user_id": self.user_id,
+                    "date": r.date,
+                    "store_name": r.store_name,
+                    "total_amount": r.total_amount,
+                    "payment_method": r.payment_method,
+                }
+                for r in targets
+            ]
+            self.client.table("receipts").upsert(parent_rows).execute()
+
+            for chunk in self._chunks(old_item_ids):
+                self.client.table("receipt_items").delete().in_("id", chunk).execute()
+        except Exception:
+            # 追加した明細を取り消し、元の状態に戻す
+            for chunk in self._chunks(new_item_ids):
+                self.client.table("receipt_items").delete().in_("id", chunk).execute()
+            raise
+
     def _get_period_start_date(self, period: str) -> str | None:
         today = datetime.date.today()
 
@@ -261,6 +509,54 @@ class SupabaseService:
 
         return {"receipts": receipts_res.data, "csv_transactions": csv_res.data}
 
+    def iter_table_pages(
+        self,
+        table: str,
+        page_size: int = PAGE_SIZE,
+        columns: str = "*",
+        where: Callable | None = None,
+    ) -> Iterator[list[dict]]:
+        # id のキーセットページネーションで全件を一定メモリで走査する
+        # (columns には id を含めること)
+        last_id = None
+        while True:
+            query = (
+                self.client.table(table)
+                .select(columns)
+                .eq("user_id", self.user_id)
+                .order("id")
+                .limit(page_size)
+            )
+            if where is not None:
+                query = where(query)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+
+            rows = query.execute().data or []
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def get_sync_rows(self, table: str, changed_since: str | None = None) -> list[dict]:
+        select = "*, receipt_items(*)" if table == "receipts" else "*"
+        if changed_since is None:
+            return self.get_all_rows(table, select)
+        return self.get_all_rows(
+            table, select, where=lambda q: q.gte("updated_at", changed_since)
+        )
+
+    def get_deleted_rows(self, deleted_since: str) -> list[dict]:
+        return self.get_all_rows(
+            "deleted_rows",
+            "id, table_name, row_id",
+            where=lambda q: q.gte("deleted_at", deleted_since),
+        )
+
     def get_learned_categories(self, item_names: list[str]) -> dict:
         if not item_names:
             return {}
@@ -285,31 +581,41 @@ class SupabaseService:
 
         return learned_data
 
+    def apply_learned_categories(self, receipts: list[dict]) -> None:
+        for receipt in receipts:
+            for item in receipt.get("items", []):
+                item["is_comparable"] = True
+
+        item_names = [
+            item["item_name"]
+            for receipt in receipts
+            for item in receipt.get("items", [])
+        ]
+        if not item_names:
+            return
+
+        learned_data = self.get_learned_categories(item_names)
+
+        for receipt in receipts:
+            for item in receipt.get("items", []):
+                name = item["item_name"]
+                if name in learned_data:
+                    pref = learned_data[name]
+                    if pref.get("main_category") is not None:
+                        item["main_category"] = pref["main_category"]
+                    if pref.get("sub_category") is not None:
+                        item["sub_category"] = pref["sub_category"]
+                    if pref.get("is_comparable") is not None:
+                        item["is_comparable"] = pref["is_comparable"]
+
     def search_items_for_memo(self, query: str) -> list[dict]:
         if not query:
             return []
 
-        keywords = query.replace("　", " ").split()
-        if not keywords:
+        search_groups = build_search_groups(query)
+        if not search_groups:
             return []
 
-        search_groups = []
-        for kw in keywords:
-            normalized = unicodedata.normalize("NFKC", kw)
-            hira = "".join(
-                [
-                    chr(ord(c) - 96) if 12449 <= ord(c) <= 12534 else c
-                    for c in normalized
-                ]
-            )
-            kata = "".join(
-                [
-                    chr(ord(c) + 96) if 12353 <= ord(c) <= 12438 else c
-                    for c in normalized
-                ]
-            )
-            search_groups.append({normalized.lower(), hira.lower(), kata.lower()})
-
         response = (
             self.client.table("receipt_items")
             .select("*, receipts(date, store_name)")
@@ -324,17 +630,67 @@ class SupabaseService:
             tags_str = " ".join(tags).lower()
             target_text = f"{item_name} {tags_str}"
 
-            is_match = True
-            for group in search_groups:
-                if not any(sw in target_text for sw in group):
-                    is_match = False
-                    break
-
-            if is_match:
+            if matches_search_groups(target_text, search_groups):
                 results.append(item)
 
         return results
 
+    def get_all_rows(
+        self, table: str, columns: str = "*", where: Callable | None = None
+    ) -> list[dict]:
+        return [
+            row
+            for page in self.iter_table_pages(table, columns=columns, where=where)
+            for row in page
+        ]
+
+    def get_comparable_items(self) -> list[dict]:
+        return self.get_all_rows(
+            "receipt_items",
+            "id, receipt_id, item_name, price, search_tags, receipts(date, store_name)",
+            lambda query: query.eq("is_comparable", True),
+        )
+
+    def get_labeled_items(self) -> list[dict]:
+        rows = self.get_all_rows(
+            "receipt_items",
+            "id, item_name, main_category, sub_category, search_tags, created_at",
+            lambda query: query.not_.is_("main_category", "null"),
+        )
+        # 同じ品名では新しいラベルを優先させるため、新しい順に並べて返す
+        rows.sort(key=lambda row: row.get("created_at") or "", reverse=True)
+        return rows
+
+    def get_global_labeled_items(self, limit: int = 20000) -> list[dict]:
+        # 全ユーザー横断のラベルは RLS を越えるため、サービスロールキーがある場合のみ使う
+        url = os.environ.get("VITE_SUPABASE_URL") or os.environ.get("SUPABASE_URL")
+        service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not service_key:
+            return []
+
+        # 他のユーザーの品名や検索タグはそのまま返さず、カテゴリ学習にだけ使う
+        client = create_client(url, service_key)
+        rows = []
+        while len(rows) < limit:
+            page = (
+                client.table("receipt_items")
+                .select("item_name, main_category, sub_category")
+                .not_.is_("main_category", "null")
+                .order("created_at", desc=True)
+                .range(len(rows), min(len(rows) + PAGE_SIZE, limit) - 1)
+                .execute()
+            ).data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+        return rows
+
+    def get_receipt_fingerprints(self) -> list[dict]:
+        return self.get_all_rows(
+            "receipts",
+            "id, date, store_name, total_amount, image_hashes, receipt_items(item_name)",
+        )
+
     def get_memo_rows(self) -> list[dict]:
         response = (
             self.client.table("memo_rows")
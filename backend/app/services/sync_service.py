@@ -0,0 +1,49 @@
+import datetime
+
+SYNC_TABLES = ("receipts", "csv_transactions", "memo_rows")
+# updated_at はトランザクション開始時刻なので、コミットが遅れた変更を取りこぼさないよう
+# カーソルより少し前から取り直す (クライアント側は id で上書きするだけなので重複してよい)
+SYNC_OVERLAP = datetime.timedelta(seconds=60)
+# deleted_rows の保持期間。これより古いカーソルは削除を取りこぼし得るので全件同期に戻す
+TOMBSTONE_RETENTION = datetime.timedelta(days=30)
+
+
+class SyncService:
+    def _parse_cursor(
+        self, cursor: str | None, now: datetime.datetime
+    ) -> datetime.datetime | None:
+        if not cursor:
+            return None
+        try:
+            since = datetime.datetime.fromisoformat(cursor)
+        except ValueError:
+            return None
+        if since.tzinfo is None or not now - TOMBSTONE_RETENTION <= since <= now:
+            return None
+        return since
+
+    def get_changes(self, supabase_service, cursor: str | None) -> dict:
+        # 取得前の時刻を次のカーソルにし、取得中に入った変更は次回の差分に含める
+        now = datetime.datetime.now(datetime.timezone.utc)
+        since = self._parse_cursor(cursor, now)
+
+        upserts = {table: [] for table in SYNC_TABLES}
+        deletes = {table: [] for table in SYNC_TABLES}
+
+        if since is None:
+            for table in SYNC_TABLES:
+                upserts[table] = supabase_service.get_sync_rows(table)
+        else:
+            changed_since = (since - SYNC_OVERLAP).isoformat()
+            for table in SYNC_TABLES:
+                upserts[table] = supabase_service.get_sync_rows(table, changed_since)
+            for row in supabase_service.get_deleted_rows(changed_since):
+                if row["table_name"] in deletes:
+                    deletes[row["table_name"]].append(row["row_id"])
+
+        return {
+            "cursor": now.isoformat(),
+            "reset": since is None,
+            "upserts": upserts,
+            "deletes": deletes,
+        }
@@ -0,0 +1,171 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 既に圧縮済みのレスポンス (エクスポートの gzip / Parquet など) は再圧縮しない
+SKIP_CONTENT_TYPES = (
+    "application/gzip",
+    "application/vnd.apache.parquet",
+    "image/",
+)
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            chunk = self._compressor.process(data)
+            return chunk + (
+                self._compressor.finish() if final else self._compressor.flush()
+            )
+
+        chunk = self._compressor.compress(data)
+        return chunk + (
+            self._compressor.flush()
+            if final
+            else self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, accept_encoding: str) -> str | None:
+        # q=0 は明示的な拒否。"*" は列挙されていない符号化の既定値になる
+        qualities: dict[str, float] = {}
+        for token in accept_encoding.split(","):
+            name, *params = [part.strip() for part in token.split(";")]
+            if not name:
+                continue
+            quality = 1.0
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip().lower() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[name.lower()] = quality
+
+        default = qualities.get("*", 0.0)
+        candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+        best = max(candidates, key=lambda name: qualities.get(name, default))
+        if qualities.get(best, default) <= 0:
+            return None
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            send,
+            encoding,
+            self.minimum_size,
+            self.gzip_level,
+            self.brotli_quality,
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        send: Send,
+        encoding: str,
+        minimum_size: int,
+        gzip_level: int,
+        brotli_quality: int,
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.start_message: Message | None = None
+        self.encoder: _Encoder | None = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(SKIP_CONTENT_TYPES)
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                self.passthrough = True
+                await self._send(start_message)
+                await self._send(message)
+                return
+
+            self.encoder = _Encoder(self.encoding, self.gzip_level, self.brotli_quality)
+            body = self.encoder.compress(body, final=not more_body)
+
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+
+            await self._send(start_message)
+            await self._send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        await self._send(
+            {
+                "type": "http.response.body",
+                "body": self.encoder.compress(body, final=not more_body),
+                "more_body": more_body,
+            }
+        )
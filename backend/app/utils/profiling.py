@@ -0,0 +1,280 @@
+import asyncio
+import concurrent.futures.thread
+import contextvars
+import datetime
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# プロファイル中のリクエストだけ区間計測の記録先が入る
+_phase_timings: contextvars.ContextVar[list | None] = contextvars.ContextVar(
+    "phase_timings", default=None
+)
+
+
+def is_admin_token(token: str | None) -> bool:
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    if not admin_token or not token:
+        return False
+    return hmac.compare_digest(admin_token, token)
+
+
+@contextmanager
+def profile_phase(name: str):
+    timings = _phase_timings.get()
+    if timings is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append(
+            {
+                "phase": name,
+                "duration_ms": round((time.perf_counter() - started_at) * 1000, 1),
+            }
+        )
+
+
+_WORK_ITEM_RUN_CODE = concurrent.futures.thread._WorkItem.run.__code__
+
+
+def _find_thread_context(frame) -> contextvars.Context | None:
+    # ワーカースレッドが実行中の処理の Context を探す。asyncio.to_thread は
+    # Context.run を包んだ _WorkItem を、AnyIO のワーカーは context 変数を持つ
+    while frame is not None:
+        if frame.f_code is _WORK_ITEM_RUN_CODE:
+            work_item = frame.f_locals.get("self")
+            fn = getattr(work_item, "fn", None)
+            context = getattr(getattr(fn, "func", None), "__self__", None)
+            return context if isinstance(context, contextvars.Context) else None
+        context = frame.f_locals.get("context")
+        if isinstance(context, contextvars.Context):
+            return context
+        frame = frame.f_back
+    return None
+
+
+class StackSampler:
+    # 別スレッドから sys._current_frames() を一定間隔で覗くだけなので、
+    # 対象コードに計測用のフックを入れずに済み、オーバーヘッドも小さい。
+    # 記録するのはイベントループのスレッドと、このリクエストの Context で
+    # 動いているワーカースレッドだけにする
+    def __init__(self, interval: float, loop_ident: int, marker: list):
+        self.interval = interval
+        self.loop_ident = loop_ident
+        self.marker = marker
+        self.frames: list[dict] = []
+        self.frame_indexes: dict[tuple, int] = {}
+        self.samples: dict[int, list[tuple[list[int], float]]] = {}
+        self.thread_names: dict[int, str] = {}
+        self.excluded_samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> float:
+        self._stop.set()
+        self._thread.join()
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def _frame_index(self, frame) -> int:
+        code = frame.f_code
+        key = (code.co_filename, code.co_firstlineno, code.co_name)
+        index = self.frame_indexes.get(key)
+        if index is None:
+            index = len(self.frames)
+            self.frame_indexes[key] = index
+            self.frames.append(
+                {
+                    "name": getattr(code, "co_qualname", code.co_name),
+                    "file": code.co_filename,
+                    "line": code.co_firstlineno,
+                }
+            )
+        return index
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight = (now - last) * 1000
+            last = now
+
+            for thread in threading.enumerate():
+                self.thread_names[thread.ident] = thread.name
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if ident != self.loop_ident:
+                    context = _find_thread_context(frame)
+                    if (
+                        context is None
+                        or context.get(_phase_timings) is not self.marker
+                    ):
+                        self.excluded_samples += 1
+                        continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_index(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.setdefault(ident, []).append((stack, weight))
+
+    def to_speedscope(self, name: str, duration_ms: float) -> dict:
+        profiles = []
+        for ident, samples in self.samples.items():
+            thread_name = self.thread_names.get(ident, str(ident))
+            if ident == self.loop_ident:
+                # イベントループは他のリクエストのコルーチンも実行するため区別できない
+                thread_name += " (event loop, shared)"
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": duration_ms,
+                    "samples": [stack for stack, _ in samples],
+                    "weights": [weight for _, weight in samples],
+                }
+            )
+
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "receipt-manager",
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+class ProfileStore:
+    def __init__(self, directory: Path, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, metadata: dict, profile: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile_id = metadata["id"]
+        (self.directory / f"{profile_id}.speedscope.json").write_text(
+            json.dumps(profile), encoding="utf-8"
+        )
+        (self.directory / f"{profile_id}.meta.json").write_text(
+            json.dumps(metadata, ensure_ascii=False), encoding="utf-8"
+        )
+        self._prune()
+
+    def _prune(self) -> None:
+        metas = sorted(self.directory.glob("*.meta.json"), key=lambda p: p.name)
+        for meta_path in metas[: max(0, len(metas) - self.max_profiles)]:
+            profile_id = meta_path.name.removesuffix(".meta.json")
+            meta_path.unlink(missing_ok=True)
+            (self.directory / f"{profile_id}.speedscope.json").unlink(missing_ok=True)
+
+    def list(self) -> list[dict]:
+        if not self.directory.exists():
+            return []
+        metas = sorted(
+            self.directory.glob("*.meta.json"), key=lambda p: p.name, reverse=True
+        )
+        return [json.loads(p.read_text(encoding="utf-8")) for p in metas]
+
+    def get_path(self, profile_id: str) -> Path | None:
+        # profile_id はファイル名に使うため、生成時と同じ形式以外は受け付けない
+        if not all(c.isalnum() or c in "-_" for c in profile_id):
+            return None
+        path = self.directory / f"{profile_id}.speedscope.json"
+        return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+    ):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._active = False
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self._active:
+            # 同時に複数のプロファイルを取るとオーバーヘッドと混線が増えるので 1 件に絞る
+            return False
+
+        headers = Headers(scope=scope)
+        if headers.get("x-profile") == "1" and is_admin_token(
+            headers.get("x-admin-token")
+        ):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        timings: list[dict] = []
+        token = _phase_timings.set(timings)
+        sampler = StackSampler(self.interval, threading.get_ident(), timings)
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = sampler.stop()
+            _phase_timings.reset(token)
+            self._active = False
+
+            timestamp = started_at.strftime("%Y%m%dT%H%M%S")
+            profile_id = f"{timestamp}-{uuid.uuid4().hex[:8]}"
+            name = f"{scope['method']} {scope['path']}"
+            metadata = {
+                "id": profile_id,
+                "name": name,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(duration_ms, 1),
+                "samples": sum(len(s) for s in sampler.samples.values()),
+                "excluded_samples": sampler.excluded_samples,
+                "interval_ms": self.interval * 1000,
+                "timings": timings,
+            }
+            await asyncio.to_thread(
+                self.store.save, metadata, sampler.to_speedscope(name, duration_ms)
+            )
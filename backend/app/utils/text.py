@@ -0,0 +1,35 @@
+import unicodedata
+
+
+def to_hiragana(text: str) -> str:
+    return "".join([chr(ord(c) - 96) if 12449 <= ord(c) <= 12534 else c for c in text])
+
+
+def to_katakana(text: str) -> str:
+    return "".join([chr(ord(c) + 96) if 12353 <= ord(c) <= 12438 else c for c in text])
+
+
+def normalize_item_name(name: str) -> str:
+    # 全角/半角・カナ/かな・大文字/小文字の揺れを吸収した比較用キー
+    normalized = unicodedata.normalize("NFKC", name or "")
+    return " ".join(to_hiragana(normalized).lower().split())
+
+
+def build_search_groups(query: str) -> list[set[str]]:
+    keywords = query.replace("　", " ").split()
+
+    search_groups = []
+    for kw in keywords:
+        normalized = unicodedata.normalize("NFKC", kw)
+        search_groups.append(
+            {
+                normalized.lower(),
+                to_hiragana(normalized).lower(),
+                to_katakana(normalized).lower(),
+            }
+        )
+    return search_groups
+
+
+def matches_search_groups(target_text: str, search_groups: list[set[str]]) -> bool:
+    return all(any(sw in target_text for sw in group) for group in search_groups)
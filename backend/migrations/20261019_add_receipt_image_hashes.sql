@@ -0,0 +1,3 @@
+-- 重複レシート検出用の画像ハッシュ (64bit dHash の 16 進文字列) を保存する
+alter table public.receipts
+    add column if not exists image_hashes text[] not null default '{}';
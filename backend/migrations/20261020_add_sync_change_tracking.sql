@@ -0,0 +1,137 @@
+-- /sync の差分取得用に、更新時刻と削除記録をトリガーで残す。
+-- API を経由しない書き込み (取り込み CLI や SQL での修正) も差分に含まれる
+
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+alter table public.receipts
+    add column if not exists updated_at timestamptz not null default now();
+alter table public.csv_transactions
+    add column if not exists updated_at timestamptz not null default now();
+alter table public.memo_rows
+    add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists receipts_user_id_updated_at_idx
+    on public.receipts (user_id, updated_at);
+create index if not exists csv_transactions_user_id_updated_at_idx
+    on public.csv_transactions (user_id, updated_at);
+create index if not exists memo_rows_user_id_updated_at_idx
+    on public.memo_rows (user_id, updated_at);
+
+drop trigger if exists receipts_set_updated_at on public.receipts;
+create trigger receipts_set_updated_at
+    before update on public.receipts
+    for each row execute function public.set_updated_at();
+
+drop trigger if exists csv_transactions_set_updated_at on public.csv_transactions;
+create trigger csv_transactions_set_updated_at
+    before update on public.csv_transactions
+    for each row execute function public.set_updated_at();
+
+drop trigger if exists memo_rows_set_updated_at on public.memo_rows;
+create trigger memo_rows_set_updated_at
+    before update on public.memo_rows
+    for each row execute function public.set_updated_at();
+
+-- 明細の変更は親レシートの更新として扱う (一括投入でも親ごとに 1 回だけ更新する)
+create or replace function public.touch_receipts_from_new_items()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.receipts
+    set updated_at = now()
+    where id in (select distinct receipt_id from new_items);
+    return null;
+end;
+$$;
+
+create or replace function public.touch_receipts_from_old_items()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.receipts
+    set updated_at = now()
+    where id in (select distinct receipt_id from old_items);
+    return null;
+end;
+$$;
+
+drop trigger if exists receipt_items_touch_receipts_insert on public.receipt_items;
+create trigger receipt_items_touch_receipts_insert
+    after insert on public.receipt_items
+    referencing new table as new_items
+    for each statement execute function public.touch_receipts_from_new_items();
+
+drop trigger if exists receipt_items_touch_receipts_update on public.receipt_items;
+create trigger receipt_items_touch_receipts_update
+    after update on public.receipt_items
+    referencing new table as new_items
+    for each statement execute function public.touch_receipts_from_new_items();
+
+drop trigger if exists receipt_items_touch_receipts_delete on public.receipt_items;
+create trigger receipt_items_touch_receipts_delete
+    after delete on public.receipt_items
+    referencing old table as old_items
+    for each statement execute function public.touch_receipts_from_old_items();
+
+-- 削除された行の記録。30 日より古いカーソルは全件同期に戻すので、
+-- 定期的に delete from public.deleted_rows where deleted_at < now() - interval '30 days' で掃除してよい
+create table if not exists public.deleted_rows (
+    id bigint generated always as identity primary key,
+    user_id uuid not null,
+    table_name text not null,
+    row_id text not null,
+    deleted_at timestamptz not null default now()
+);
+
+create index if not exists deleted_rows_user_id_deleted_at_idx
+    on public.deleted_rows (user_id, deleted_at);
+
+alter table public.deleted_rows enable row level security;
+
+drop policy if exists "deleted_rows_select_own" on public.deleted_rows;
+create policy "deleted_rows_select_own"
+    on public.deleted_rows
+    for select
+    using (auth.uid() = user_id);
+
+-- 利用者には insert を許可しないため、トリガー関数は所有者権限で書き込む
+create or replace function public.record_deleted_rows()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    insert into public.deleted_rows (user_id, table_name, row_id)
+    select user_id, tg_table_name, id::text from old_rows;
+    return null;
+end;
+$$;
+
+drop trigger if exists receipts_record_deleted_rows on public.receipts;
+create trigger receipts_record_deleted_rows
+    after delete on public.receipts
+    referencing old table as old_rows
+    for each statement execute function public.record_deleted_rows();
+
+drop trigger if exists csv_transactions_record_deleted_rows on public.csv_transactions;
+create trigger csv_transactions_record_deleted_rows
+    after delete on public.csv_transactions
+    referencing old table as old_rows
+    for each statement execute function public.record_deleted_rows();
+
+drop trigger if exists memo_rows_record_deleted_rows on public.memo_rows;
+create trigger memo_rows_record_deleted_rows
+    after delete on public.memo_rows
+    referencing old table as old_rows
+    for each statement execute function public.record_deleted_rows();
@@ -1,4 +1,4 @@
-import { apiClient } from '@/lib/apiClient'
+import { apiClient, withRateLimitRetry } from '@/lib/apiClient'
 import { type CsvMapping, type ParsedTransaction } from '../types'
 
 interface CsvParseResponse {
@@ -8,12 +8,19 @@ interface CsvParseResponse {
 
 export const analyzeCsv = async (
   csvText: string,
+  headers: Record<string, string>,
   mapping?: CsvMapping
 ): Promise<CsvParseResponse> => {
-  const response = await apiClient.post<CsvParseResponse>('/analyze_csv', {
-    csv_text: csvText,
-    mapping: mapping,
-  })
+  const response = await withRateLimitRetry(() =>
+    apiClient.post<CsvParseResponse>(
+      '/analyze_csv',
+      {
+        csv_text: csvText,
+        mapping: mapping,
+      },
+      { headers }
+    )
+  )
 
   return response.data
 }
@@ -9,6 +9,7 @@ import {
 } from '../types'
 import { useApiConfig } from '@/hooks/useApiConfig'
 import { supabase } from '@/lib/supabase'
+import { RateLimitError } from '@/lib/apiClient'
 import { DEFAULT_PRESET_ICON, resolvePresetIcon } from '../utils/emoji'
 
 export const useCsvUploader = () => {
@@ -115,11 +116,14 @@ export const useCsvUploader = () => {
 
   const handleAnalyze = async () => {
     if (!csvText) return
+    const headers = await getHeaders()
+    if (!headers) return
+
     setIsAnalyzing(true)
 
     try {
       const preset = presets.find((p) => p.id === selectedPresetId)
-      const result = await analyzeCsv(csvText, preset?.mapping)
+      const result = await analyzeCsv(csvText, headers, preset?.mapping)
 
       if (result.transactions.length === 0) {
         alert(
@@ -136,6 +140,12 @@ export const useCsvUploader = () => {
       }
     } catch (error) {
       console.error('Error analyzing CSV:', error)
+      if (error instanceof RateLimitError) {
+        alert(
+          `リクエストが混み合っています。${error.retryAfter}秒後にもう一度お試しください。`
+        )
+        return
+      }
       alert('CSVの解析中にエラーが発生しました')
     } finally {
       setIsAnalyzing(false)
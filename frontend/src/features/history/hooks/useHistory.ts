@@ -1,8 +1,9 @@
 import { useState, useEffect, useMemo } from 'react'
 import { useApiConfig } from '@/hooks/useApiConfig'
+import { useAuth } from '@/contexts/AuthContext'
+import { syncData, getSyncedRows } from '@/lib/syncCache'
 import {
   fetchTransactions,
-  fetchAvailableMonths,
   deleteCsvTransaction,
   deleteReceipt,
   updateReceipt,
@@ -20,6 +21,8 @@ export const useHistory = (
   receiptFocusTarget?: HistoryReceiptFocusTarget | null
 ) => {
   const { getHeaders } = useApiConfig()
+  const { session } = useAuth()
+  const userId = session?.user.id
 
   const [activeTab, setActiveTab] = useState<'receipts' | 'csv'>('receipts')
   const [receipts, setReceipts] = useState<HistoryReceipt[]>([])
@@ -57,21 +60,33 @@ export const useHistory = (
     const initLoad = async () => {
       setIsLoading(true)
       const headers = await getHeaders()
-      if (headers) {
+      if (headers && userId) {
         try {
-          const monthsData = await fetchAvailableMonths(headers)
-          setReceiptMonths(monthsData.receipts)
-          setCsvMonths(monthsData.csv)
+          // 前回同期以降の差分だけを取得し、全期間の履歴を手元に揃える
+          const synced = await syncData(userId, headers)
+          const allReceipts = getSyncedRows<HistoryReceipt>(synced, 'receipts')
+          const allCsv = getSyncedRows<HistoryCsvTransaction>(
+            synced,
+            'csv_transactions'
+          )
 
           const d = new Date()
           const fallbackMonth = `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}`
+          const toMonths = (dates: string[]) => {
+            const months = [
+              ...new Set(dates.filter(Boolean).map((date) => date.slice(0, 7))),
+            ]
+            return months.length > 0 ? months.sort().reverse() : [fallbackMonth]
+          }
+          const monthsData = {
+            receipts: toMonths(allReceipts.map((r) => r.date)),
+            csv: toMonths(allCsv.map((c) => c.date)),
+          }
+          setReceiptMonths(monthsData.receipts)
+          setCsvMonths(monthsData.csv)
 
-          const latestReceiptMonth =
-            monthsData.receipts.length > 0
-              ? monthsData.receipts[0]
-              : fallbackMonth
-          const latestCsvMonth =
-            monthsData.csv.length > 0 ? monthsData.csv[0] : fallbackMonth
+          const latestReceiptMonth = monthsData.receipts[0]
+          const latestCsvMonth = monthsData.csv[0]
 
           const focusMonth = receiptFocusTarget?.receiptDate.slice(0, 7)
           const initialReceiptMonth = focusMonth ?? latestReceiptMonth
@@ -89,11 +104,16 @@ export const useHistory = (
             setExpandedReceiptId(receiptFocusTarget.receiptId)
           }
 
-          const data = await fetchTransactions(initialMonthToLoad, headers)
-          setReceipts(data.receipts || [])
-          setCsvData(data.csv_transactions || [])
+          setReceipts(allReceipts)
+          setCsvData(allCsv)
 
-          setLoadedMonths(new Set([initialMonthToLoad]))
+          setLoadedMonths(
+            new Set([
+              initialMonthToLoad,
+              ...monthsData.receipts,
+              ...monthsData.csv,
+            ])
+          )
         } catch (error) {
           console.error('データの取得に失敗しました:', error)
           toast.error('データの取得に失敗しました。')
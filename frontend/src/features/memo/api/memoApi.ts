@@ -1,13 +1,14 @@
 import { apiClient } from '@/lib/apiClient'
-import type { MemoRowRecord, MemoSearchResultItem } from '../types'
+import type { MemoPriceTrend, MemoRowRecord } from '../types'
 
-export const searchMemoItems = async (
+// 生の購入明細ではなく、サーバーで集約済みの価格推移と直近の購入だけを受け取る
+export const fetchPriceTrends = async (
   query: string,
   headers: Record<string, string>
-): Promise<MemoSearchResultItem[]> => {
-  const response = await apiClient.get<{ items: MemoSearchResultItem[] }>(
-    `/memo/search?query=${encodeURIComponent(query)}`,
-    { headers }
+): Promise<MemoPriceTrend[]> => {
+  const response = await apiClient.get<{ items: MemoPriceTrend[] }>(
+    '/memo/price_history',
+    { headers, params: { query } }
   )
   return response.data.items
 }
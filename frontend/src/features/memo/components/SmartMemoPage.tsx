@@ -4,12 +4,13 @@ import { Input } from '@/components/ui/Input'
 import {
   createMemoRow,
   deleteMemoRow,
-  fetchMemoRows,
-  searchMemoItems,
+  fetchPriceTrends,
   updateMemoRow,
 } from '../api/memoApi'
-import type { MemoRowRecord, MemoSearchResultItem } from '../types'
+import type { MemoPriceTrend, MemoPurchase, MemoRowRecord } from '../types'
 import { useApiConfig } from '@/hooks/useApiConfig'
+import { useAuth } from '@/contexts/AuthContext'
+import { syncData, getSyncedRows } from '@/lib/syncCache'
 import {
   CartesianGrid,
   Line,
@@ -34,7 +35,7 @@ type MemoRowState = {
   id: string
   query: string
   sortOrder: number
-  results: MemoSearchResultItem[]
+  results: MemoPriceTrend[]
   excludedItemNames: string[]
   isLoading: boolean
   hasSearched: boolean
@@ -45,11 +46,18 @@ type ChartPoint = {
   id: string
   date: string
   price: number
-  store: string
   name: string
   isTransition: boolean
 }
 
+type PurchaseEntry = MemoPurchase & {
+  id: string
+  item_name: string
+}
+
+const countPurchases = (trends: MemoPriceTrend[]) =>
+  trends.reduce((sum, trend) => sum + trend.stats.count, 0)
+
 const CompactPriceTooltip = ({
   active,
   payload,
@@ -84,6 +92,8 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
   onOpenHistory,
 }) => {
   const { getHeaders } = useApiConfig()
+  const { session } = useAuth()
+  const userId = session?.user.id
   const [rows, setRows] = useState<MemoRowState[]>([])
   const [activeRowId, setActiveRowId] = useState<string | null>(null)
   const [isBootstrapping, setIsBootstrapping] = useState(true)
@@ -375,10 +385,7 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
     }
 
     try {
-      const data = await searchMemoItems(trimmed, headers)
-      const sortedData = data.sort((a, b) =>
-        a.receipts.date.localeCompare(b.receipts.date)
-      )
+      const data = await fetchPriceTrends(trimmed, headers)
 
       if (requestSequenceRef.current[rowId] !== requestId) return
 
@@ -387,7 +394,7 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
           row.id === rowId
             ? {
                 ...row,
-                results: sortedData,
+                results: data,
                 excludedItemNames: [],
                 isLoading: false,
               }
@@ -443,7 +450,7 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
   useEffect(() => {
     const initializeRows = async () => {
       const headers = await getHeaders()
-      if (!headers) {
+      if (!headers || !userId) {
         setIsBootstrapping(false)
         return
       }
@@ -452,7 +459,14 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
           typeof window === 'undefined' ||
           window.matchMedia('(min-width: 640px)').matches
 
-        const savedRows = await fetchMemoRows(headers)
+        const synced = await syncData(userId, headers)
+        const savedRows = getSyncedRows<
+          MemoRowRecord & { created_at?: string }
+        >(synced, 'memo_rows').sort(
+          (a, b) =>
+            a.sort_order - b.sort_order ||
+            (a.created_at ?? '').localeCompare(b.created_at ?? '')
+        )
         if (savedRows.length === 0) {
           const createdRow = await createMemoRow(
             { query: '', sortOrder: 0 },
@@ -510,31 +524,48 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
 
   const filteredResults =
     activeRow?.results.filter(
-      (item) => !activeRow.excludedItemNames.includes(item.item_name)
+      (trend) => !activeRow.excludedItemNames.includes(trend.item_name)
     ) ?? []
   const uniqueItemNames = activeRow
-    ? Array.from(new Set(activeRow.results.map((item) => item.item_name)))
+    ? Array.from(new Set(activeRow.results.map((trend) => trend.item_name)))
     : []
-  const isComparable = filteredResults.some(
-    (item) => item.is_comparable ?? true
-  )
-  const chartData: ChartPoint[] = filteredResults.map((item, index, arr) => ({
-    id: item.id,
-    date: item.receipts.date,
-    price: item.price,
-    store: item.receipts.store_name,
-    name: item.item_name,
-    isTransition: index === 0 || item.price !== arr[index - 1].price,
-  }))
+  // グラフと統計はサーバーで集約済みの値を使い、生の明細は直近の購入だけを受け取る
+  const purchases: PurchaseEntry[] = filteredResults
+    .flatMap((trend) =>
+      trend.recent.map((purchase) => ({
+        ...purchase,
+        id: `${trend.key}:${purchase.receipt_id}`,
+        item_name: trend.item_name,
+      }))
+    )
+    .sort((a, b) => b.date.localeCompare(a.date))
+  const chartData: ChartPoint[] = filteredResults
+    .flatMap((trend) =>
+      trend.series.map((bucket) => ({
+        id: `${trend.key}:${bucket.last_receipt_id}`,
+        date: bucket.date,
+        price: bucket.avg_price,
+        name: trend.item_name,
+      }))
+    )
+    .sort((a, b) => a.date.localeCompare(b.date))
+    .map((point, index, arr) => ({
+      ...point,
+      isTransition: index === 0 || point.price !== arr[index - 1].price,
+    }))
+  const purchaseCount = countPurchases(filteredResults)
   const minPrice =
     filteredResults.length > 0
-      ? Math.min(...filteredResults.map((item) => item.price))
+      ? Math.min(...filteredResults.map((trend) => trend.stats.min_price ?? 0))
       : 0
   const avgPrice =
-    filteredResults.length > 0
+    purchaseCount > 0
       ? Math.round(
-          filteredResults.reduce((sum, item) => sum + item.price, 0) /
-            filteredResults.length
+          filteredResults.reduce(
+            (sum, trend) =>
+              sum + (trend.stats.avg_price ?? 0) * trend.stats.count,
+            0
+          ) / purchaseCount
         )
       : 0
 
@@ -649,7 +680,7 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
                       : row.isLoading
                         ? '検索中...'
                         : row.hasSearched
-                          ? `${row.results.length} 件`
+                          ? `${countPurchases(row.results)} 件`
                           : 'キーワード待ち'}
                   </div>
                 </div>
@@ -704,93 +735,85 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
                             </div>
 
                             {filteredResults.length > 0 ? (
-                              isComparable ? (
-                                <div className="bg-blue-50 border border-blue-100 rounded-xl p-4 shadow-sm">
-                                  <div className="grid grid-cols-2 gap-4 mb-4">
-                                    <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
-                                      <div className="text-xs font-bold text-gray-500 mb-1">
-                                        最安値
-                                      </div>
-                                      <div className="text-xl font-extrabold text-blue-700">
-                                        ¥{minPrice.toLocaleString()}
-                                      </div>
+                              <div className="bg-blue-50 border border-blue-100 rounded-xl p-4 shadow-sm">
+                                <div className="grid grid-cols-2 gap-4 mb-4">
+                                  <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
+                                    <div className="text-xs font-bold text-gray-500 mb-1">
+                                      最安値
                                     </div>
-                                    <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
-                                      <div className="text-xs font-bold text-gray-500 mb-1">
-                                        平均価格
-                                      </div>
-                                      <div className="text-xl font-extrabold text-gray-800">
-                                        ¥{avgPrice.toLocaleString()}
-                                      </div>
+                                    <div className="text-xl font-extrabold text-blue-700">
+                                      ¥{minPrice.toLocaleString()}
                                     </div>
                                   </div>
+                                  <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
+                                    <div className="text-xs font-bold text-gray-500 mb-1">
+                                      平均価格
+                                    </div>
+                                    <div className="text-xl font-extrabold text-gray-800">
+                                      ¥{avgPrice.toLocaleString()}
+                                    </div>
+                                  </div>
+                                </div>
 
-                                  <div
-                                    className="h-[220px] bg-white p-3 rounded-lg shadow-sm border border-gray-100 [&_*:focus]:outline-none [&_*:focus-visible]:outline-none"
-                                    onMouseLeave={() =>
-                                      setHighlightedItemId(null)
-                                    }
+                                <div
+                                  className="h-[220px] bg-white p-3 rounded-lg shadow-sm border border-gray-100 [&_*:focus]:outline-none [&_*:focus-visible]:outline-none"
+                                  onMouseLeave={() => setHighlightedItemId(null)}
+                                >
+                                  <ResponsiveContainer
+                                    width="100%"
+                                    height="100%"
                                   >
-                                    <ResponsiveContainer
-                                      width="100%"
-                                      height="100%"
+                                    <LineChart
+                                      data={chartData}
+                                      onMouseMove={(state) =>
+                                        handleChartInteraction(state, false)
+                                      }
+                                      onClick={(state) =>
+                                        handleChartInteraction(state, true)
+                                      }
+                                      margin={{
+                                        top: 10,
+                                        right: 10,
+                                        left: -20,
+                                        bottom: 0,
+                                      }}
                                     >
-                                      <LineChart
-                                        data={chartData}
-                                        onMouseMove={(state) =>
-                                          handleChartInteraction(state, false)
-                                        }
-                                        onClick={(state) =>
-                                          handleChartInteraction(state, true)
-                                        }
-                                        margin={{
-                                          top: 10,
-                                          right: 10,
-                                          left: -20,
-                                          bottom: 0,
+                                      <CartesianGrid
+                                        strokeDasharray="3 3"
+                                        vertical={false}
+                                        stroke="#E5E7EB"
+                                      />
+                                      <XAxis
+                                        dataKey="date"
+                                        tick={{
+                                          fontSize: 12,
+                                          fill: '#6B7280',
                                         }}
-                                      >
-                                        <CartesianGrid
-                                          strokeDasharray="3 3"
-                                          vertical={false}
-                                          stroke="#E5E7EB"
-                                        />
-                                        <XAxis
-                                          dataKey="date"
-                                          tick={{
-                                            fontSize: 12,
-                                            fill: '#6B7280',
-                                          }}
-                                          tickMargin={8}
-                                        />
-                                        <YAxis
-                                          tick={{
-                                            fontSize: 12,
-                                            fill: '#6B7280',
-                                          }}
-                                          tickMargin={8}
-                                        />
-                                        <Tooltip
-                                          content={CompactPriceTooltip}
-                                          cursor={{ stroke: '#93C5FD' }}
-                                        />
-                                        <Line
-                                          type="monotone"
-                                          dataKey="price"
-                                          stroke="#1D4ED8"
-                                          strokeWidth={3}
-                                          dot={renderChartDot}
-                                          activeDot={{ r: 6 }}
-                                        />
-                                      </LineChart>
-                                    </ResponsiveContainer>
-                                  </div>
-                                </div>
-                              ) : (
-                                <div className="text-center py-6 text-gray-500 font-bold border border-dashed rounded-lg border-gray-200 bg-gray-50 text-sm">
-                                  価格比較グラフは表示できません。
+                                        tickMargin={8}
+                                      />
+                                      <YAxis
+                                        tick={{
+                                          fontSize: 12,
+                                          fill: '#6B7280',
+                                        }}
+                                        tickMargin={8}
+                                      />
+                                      <Tooltip
+                                        content={CompactPriceTooltip}
+                                        cursor={{ stroke: '#93C5FD' }}
+                                      />
+                                      <Line
+                                        type="monotone"
+                                        dataKey="price"
+                                        stroke="#1D4ED8"
+                                        strokeWidth={3}
+                                        dot={renderChartDot}
+                                        activeDot={{ r: 6 }}
+                                      />
+                                    </LineChart>
+                                  </ResponsiveContainer>
                                 </div>
-                              )
+                              </div>
                             ) : (
                               <div className="text-center py-6 text-gray-400 font-bold border-2 border-dashed rounded-lg border-gray-200 bg-gray-50">
                                 表示する商品が選択されていません。
@@ -820,50 +843,46 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
                         !activeRow.isLoading &&
                         (filteredResults.length > 0 ? (
                           <ul className="divide-y divide-gray-100 flex-1 overflow-y-auto max-h-64">
-                            {filteredResults
-                              .slice()
-                              .reverse()
-                              .map((item) => (
-                                <li
-                                  key={item.id}
-                                  ref={(el) => {
-                                    historyItemRefs.current[item.id] = el
-                                  }}
-                                  className={`p-3 transition-colors flex justify-between items-center gap-2 ${
-                                    highlightedItemId === item.id
-                                      ? 'bg-blue-50 ring-2 ring-inset ring-blue-300'
-                                      : 'hover:bg-gray-50'
-                                  }`}
-                                >
-                                  <div className="flex flex-col min-w-0">
-                                    <span className="text-xs font-bold text-gray-500 truncate">
-                                      {item.receipts.date} |{' '}
-                                      {item.receipts.store_name}
-                                    </span>
-                                    <span className="text-sm font-extrabold text-gray-800 truncate">
-                                      {item.item_name}
-                                    </span>
-                                  </div>
-                                  <div className="flex items-center gap-2 shrink-0">
-                                    <button
-                                      type="button"
-                                      onClick={() =>
-                                        onOpenHistory({
-                                          receiptId: item.receipt_id,
-                                          receiptDate: item.receipts.date,
-                                          itemName: item.item_name,
-                                        })
-                                      }
-                                      className="text-xs font-bold text-blue-700 bg-blue-50 border border-blue-200 px-2.5 py-1 rounded-md hover:bg-blue-100 transition-colors"
-                                    >
-                                      履歴へ
-                                    </button>
-                                    <div className="text-base font-extrabold text-gray-800 text-right">
-                                      ¥{item.price.toLocaleString()}
-                                    </div>
+                            {purchases.map((item, index) => (
+                              <li
+                                key={`${item.id}:${index}`}
+                                ref={(el) => {
+                                  historyItemRefs.current[item.id] = el
+                                }}
+                                className={`p-3 transition-colors flex justify-between items-center gap-2 ${
+                                  highlightedItemId === item.id
+                                    ? 'bg-blue-50 ring-2 ring-inset ring-blue-300'
+                                    : 'hover:bg-gray-50'
+                                }`}
+                              >
+                                <div className="flex flex-col min-w-0">
+                                  <span className="text-xs font-bold text-gray-500 truncate">
+                                    {item.date} | {item.store_name}
+                                  </span>
+                                  <span className="text-sm font-extrabold text-gray-800 truncate">
+                                    {item.item_name}
+                                  </span>
+                                </div>
+                                <div className="flex items-center gap-2 shrink-0">
+                                  <button
+                                    type="button"
+                                    onClick={() =>
+                                      onOpenHistory({
+                                        receiptId: item.receipt_id,
+                                        receiptDate: item.date,
+                                        itemName: item.item_name,
+                                      })
+                                    }
+                                    className="text-xs font-bold text-blue-700 bg-blue-50 border border-blue-200 px-2.5 py-1 rounded-md hover:bg-blue-100 transition-colors"
+                                  >
+                                    履歴へ
+                                  </button>
+                                  <div className="text-base font-extrabold text-gray-800 text-right">
+                                    ¥{item.price.toLocaleString()}
                                   </div>
-                                </li>
-                              ))}
+                                </div>
+                              </li>
+                            ))}
                           </ul>
                         ) : (
                           <div className="flex-1 flex items-center justify-center text-gray-400 font-bold border-2 border-dashed rounded-lg border-gray-200 bg-gray-50 m-4 text-center text-sm px-4">
@@ -936,82 +955,76 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
                         </div>
 
                         {filteredResults.length > 0 ? (
-                          isComparable ? (
-                            <div className="bg-blue-50 border border-blue-100 rounded-xl p-4 shadow-sm">
-                              <div className="grid grid-cols-2 gap-4 mb-4">
-                                <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
-                                  <div className="text-xs lg:text-sm font-bold text-gray-500 mb-1">
-                                    最安値
-                                  </div>
-                                  <div className="text-xl lg:text-2xl font-extrabold text-blue-700">
-                                    ¥{minPrice.toLocaleString()}
-                                  </div>
+                          <div className="bg-blue-50 border border-blue-100 rounded-xl p-4 shadow-sm">
+                            <div className="grid grid-cols-2 gap-4 mb-4">
+                              <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
+                                <div className="text-xs lg:text-sm font-bold text-gray-500 mb-1">
+                                  最安値
                                 </div>
-                                <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
-                                  <div className="text-xs lg:text-sm font-bold text-gray-500 mb-1">
-                                    平均価格
-                                  </div>
-                                  <div className="text-xl lg:text-2xl font-extrabold text-gray-800">
-                                    ¥{avgPrice.toLocaleString()}
-                                  </div>
+                                <div className="text-xl lg:text-2xl font-extrabold text-blue-700">
+                                  ¥{minPrice.toLocaleString()}
                                 </div>
                               </div>
-
-                              <div
-                                className="h-[220px] lg:h-[300px] bg-white p-3 rounded-lg shadow-sm border border-gray-100 [&_*:focus]:outline-none [&_*:focus-visible]:outline-none"
-                                onMouseLeave={() => setHighlightedItemId(null)}
-                              >
-                                <ResponsiveContainer width="100%" height="100%">
-                                  <LineChart
-                                    data={chartData}
-                                    onMouseMove={(state) =>
-                                      handleChartInteraction(state, false)
-                                    }
-                                    onClick={(state) =>
-                                      handleChartInteraction(state, true)
-                                    }
-                                    margin={{
-                                      top: 10,
-                                      right: 10,
-                                      left: -20,
-                                      bottom: 0,
-                                    }}
-                                  >
-                                    <CartesianGrid
-                                      strokeDasharray="3 3"
-                                      vertical={false}
-                                      stroke="#E5E7EB"
-                                    />
-                                    <XAxis
-                                      dataKey="date"
-                                      tick={{ fontSize: 12, fill: '#6B7280' }}
-                                      tickMargin={8}
-                                    />
-                                    <YAxis
-                                      tick={{ fontSize: 12, fill: '#6B7280' }}
-                                      tickMargin={8}
-                                    />
-                                    <Tooltip
-                                      content={CompactPriceTooltip}
-                                      cursor={{ stroke: '#93C5FD' }}
-                                    />
-                                    <Line
-                                      type="monotone"
-                                      dataKey="price"
-                                      stroke="#1D4ED8"
-                                      strokeWidth={3}
-                                      dot={renderChartDot}
-                                      activeDot={{ r: 6 }}
-                                    />
-                                  </LineChart>
-                                </ResponsiveContainer>
+                              <div className="bg-white p-3 rounded-lg shadow-sm text-center border border-gray-100">
+                                <div className="text-xs lg:text-sm font-bold text-gray-500 mb-1">
+                                  平均価格
+                                </div>
+                                <div className="text-xl lg:text-2xl font-extrabold text-gray-800">
+                                  ¥{avgPrice.toLocaleString()}
+                                </div>
                               </div>
                             </div>
-                          ) : (
-                            <div className="text-center py-6 text-gray-500 font-bold border border-dashed rounded-lg border-gray-200 bg-gray-50 text-sm lg:text-base">
-                              価格比較グラフは表示できません。
+
+                            <div
+                              className="h-[220px] lg:h-[300px] bg-white p-3 rounded-lg shadow-sm border border-gray-100 [&_*:focus]:outline-none [&_*:focus-visible]:outline-none"
+                              onMouseLeave={() => setHighlightedItemId(null)}
+                            >
+                              <ResponsiveContainer width="100%" height="100%">
+                                <LineChart
+                                  data={chartData}
+                                  onMouseMove={(state) =>
+                                    handleChartInteraction(state, false)
+                                  }
+                                  onClick={(state) =>
+                                    handleChartInteraction(state, true)
+                                  }
+                                  margin={{
+                                    top: 10,
+                                    right: 10,
+                                    left: -20,
+                                    bottom: 0,
+                                  }}
+                                >
+                                  <CartesianGrid
+                                    strokeDasharray="3 3"
+                                    vertical={false}
+                                    stroke="#E5E7EB"
+                                  />
+                                  <XAxis
+                                    dataKey="date"
+                                    tick={{ fontSize: 12, fill: '#6B7280' }}
+                                    tickMargin={8}
+                                  />
+                                  <YAxis
+                                    tick={{ fontSize: 12, fill: '#6B7280' }}
+                                    tickMargin={8}
+                                  />
+                                  <Tooltip
+                                    content={CompactPriceTooltip}
+                                    cursor={{ stroke: '#93C5FD' }}
+                                  />
+                                  <Line
+                                    type="monotone"
+                                    dataKey="price"
+                                    stroke="#1D4ED8"
+                                    strokeWidth={3}
+                                    dot={renderChartDot}
+                                    activeDot={{ r: 6 }}
+                                  />
+                                </LineChart>
+                              </ResponsiveContainer>
                             </div>
-                          )
+                          </div>
                         ) : (
                           <div className="text-center py-6 text-gray-400 font-bold border-2 border-dashed rounded-lg border-gray-200 bg-gray-50">
                             表示する商品が選択されていません。
@@ -1045,49 +1058,46 @@ export const SmartMemoPage: React.FC<SmartMemoPageProps> = ({
                 !activeRow.isLoading &&
                 (filteredResults.length > 0 ? (
                   <ul className="divide-y divide-gray-100 flex-1 overflow-y-auto max-h-64 lg:max-h-none">
-                    {filteredResults
-                      .slice()
-                      .reverse()
-                      .map((item) => (
-                        <li
-                          key={item.id}
-                          ref={(el) => {
-                            historyItemRefs.current[item.id] = el
-                          }}
-                          className={`p-3 lg:p-4 transition-colors flex justify-between items-center gap-2 ${
-                            highlightedItemId === item.id
-                              ? 'bg-blue-50 ring-2 ring-inset ring-blue-300'
-                              : 'hover:bg-gray-50'
-                          }`}
-                        >
-                          <div className="flex flex-col min-w-0">
-                            <span className="text-xs lg:text-sm font-bold text-gray-500 truncate">
-                              {item.receipts.date} | {item.receipts.store_name}
-                            </span>
-                            <span className="text-sm lg:text-base font-extrabold text-gray-800 truncate">
-                              {item.item_name}
-                            </span>
-                          </div>
-                          <div className="flex items-center gap-2 shrink-0">
-                            <button
-                              type="button"
-                              onClick={() =>
-                                onOpenHistory({
-                                  receiptId: item.receipt_id,
-                                  receiptDate: item.receipts.date,
-                                  itemName: item.item_name,
-                                })
-                              }
-                              className="text-xs lg:text-sm font-bold text-blue-700 bg-blue-50 border border-blue-200 px-2.5 py-1 lg:px-3 lg:py-1.5 rounded-md hover:bg-blue-100 transition-colors"
-                            >
-                              履歴へ
-                            </button>
-                            <div className="text-base lg:text-lg font-extrabold text-gray-800 text-right">
-                              ¥{item.price.toLocaleString()}
-                            </div>
+                    {purchases.map((item, index) => (
+                      <li
+                        key={`${item.id}:${index}`}
+                        ref={(el) => {
+                          historyItemRefs.current[item.id] = el
+                        }}
+                        className={`p-3 lg:p-4 transition-colors flex justify-between items-center gap-2 ${
+                          highlightedItemId === item.id
+                            ? 'bg-blue-50 ring-2 ring-inset ring-blue-300'
+                            : 'hover:bg-gray-50'
+                        }`}
+                      >
+                        <div className="flex flex-col min-w-0">
+                          <span className="text-xs lg:text-sm font-bold text-gray-500 truncate">
+                            {item.date} | {item.store_name}
+                          </span>
+                          <span className="text-sm lg:text-base font-extrabold text-gray-800 truncate">
+                            {item.item_name}
+                          </span>
+                        </div>
+                        <div className="flex items-center gap-2 shrink-0">
+                          <button
+                            type="button"
+                            onClick={() =>
+                              onOpenHistory({
+                                receiptId: item.receipt_id,
+                                receiptDate: item.date,
+                                itemName: item.item_name,
+                              })
+                            }
+                            className="text-xs lg:text-sm font-bold text-blue-700 bg-blue-50 border border-blue-200 px-2.5 py-1 lg:px-3 lg:py-1.5 rounded-md hover:bg-blue-100 transition-colors"
+                          >
+                            履歴へ
+                          </button>
+                          <div className="text-base lg:text-lg font-extrabold text-gray-800 text-right">
+                            ¥{item.price.toLocaleString()}
                           </div>
-                        </li>
-                      ))}
+                        </div>
+                      </li>
+                    ))}
                   </ul>
                 ) : (
                   <div className="flex-1 flex items-center justify-center text-gray-400 font-bold border-2 border-dashed rounded-lg border-gray-200 bg-gray-50 m-4 text-center text-sm px-4">
@@ -1,16 +1,34 @@
-export interface MemoSearchResultItem {
-  id: string
+export interface MemoPriceStats {
+  count: number
+  min_price: number | null
+  avg_price: number | null
+  last_price: number | null
+  last_date: string | null
+}
+
+export interface MemoPriceBucket {
+  date: string
+  min_price: number
+  avg_price: number
+  last_price: number
+  last_receipt_id: string
+  count: number
+}
+
+export interface MemoPurchase {
+  date: string
   receipt_id: string
-  item_name: string
+  store_name: string
   price: number
-  main_category: string | null
-  sub_category: string | null
-  search_tags: string[] | null
-  is_comparable: boolean
-  receipts: {
-    date: string
-    store_name: string
-  }
+}
+
+export interface MemoPriceTrend {
+  key: string
+  item_name: string
+  stats: MemoPriceStats
+  stores: (MemoPriceStats & { store_name: string })[]
+  series: MemoPriceBucket[]
+  recent: MemoPurchase[]
 }
 
 export interface MemoRowRecord {
@@ -1,4 +1,4 @@
-import { apiClient } from '@/lib/apiClient'
+import { apiClient, withRateLimitRetry } from '@/lib/apiClient'
 import type { Receipt } from '../types'
 
 interface ReceiptResponse {
@@ -14,12 +14,14 @@ export const analyzeReceipt = async (
     formData.append('files', file)
   })
 
-  const response = await apiClient.post<ReceiptResponse>('/analyze', formData, {
-    headers: {
-      'Content-Type': 'multipart/form-data',
-      ...headers,
-    },
-  })
+  const response = await withRateLimitRetry(() =>
+    apiClient.post<ReceiptResponse>('/analyze', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+        ...headers,
+      },
+    })
+  )
 
   return response.data
 }
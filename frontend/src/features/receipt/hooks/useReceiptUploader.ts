@@ -1,6 +1,7 @@
 import React, { useState } from 'react'
 import axios from 'axios'
 import { useApiConfig } from '@/hooks/useApiConfig'
+import { RateLimitError } from '@/lib/apiClient'
 import { type Receipt, type UploadTask } from '../types'
 import { analyzeReceipt, saveTransaction } from '../api/receiptApi'
 import { toast } from 'sonner'
@@ -239,8 +240,36 @@ export const useReceiptUploader = () => {
         )
       )
       toast.success(`${data.receipts.length}枚のレシートを検出しました！`)
+      const duplicateCount = data.receipts.filter(
+        (r) => r.duplicates && r.duplicates.length > 0
+      ).length
+      if (duplicateCount > 0) {
+        toast.warning(
+          `${duplicateCount}枚のレシートは既に保存済みの可能性があります。`
+        )
+      }
+      const similarImageCount = data.receipts.filter(
+        (r) =>
+          !(r.duplicates && r.duplicates.length > 0) &&
+          r.possible_duplicates &&
+          r.possible_duplicates.length > 0
+      ).length
+      if (similarImageCount > 0) {
+        toast.info(
+          `${similarImageCount}枚のレシートは保存済みのレシートと画像が似ています。内容をご確認ください。`
+        )
+      }
     } catch (error) {
       console.error(error)
+      if (error instanceof RateLimitError) {
+        updateTasks((prev) =>
+          prev.map((t) => (t.id === taskId ? { ...t, status: 'error' } : t))
+        )
+        toast.error(
+          `リクエストが混み合っています。${error.retryAfter}秒後にもう一度お試しください。`
+        )
+        return
+      }
       if (
         axios.isAxiosError(error) &&
         (error.response?.status === 401 || error.response?.status === 403)
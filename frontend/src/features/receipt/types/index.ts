@@ -7,12 +7,22 @@ export interface ReceiptItem {
   is_comparable: boolean
 }
 
+export interface DuplicateCandidate {
+  receipt_id: string
+  reasons: string[]
+  item_similarity?: number
+  confidence: 'high' | 'low'
+}
+
 export interface Receipt {
   purchase_date: string
   store_name: string
   items: ReceiptItem[]
   total_amount: number
   payment_method: string
+  image_hashes?: string[]
+  duplicates?: DuplicateCandidate[]
+  possible_duplicates?: DuplicateCandidate[]
 }
 
 // 編集用のアイテム型 価格は空文字も許容
@@ -1,19 +1,29 @@
-import { apiClient } from '@/lib/apiClient'
+import { apiClient, withRateLimitRetry } from '@/lib/apiClient'
 
 interface SearchResponse {
   answer: string
+  session_id: string | null
 }
 
 export const searchReceipts = async (
   query: string,
   dataType: string,
   period: string,
-  headers: Record<string, string>
+  headers: Record<string, string>,
+  sessionId: string | null = null
 ) => {
-  const response = await apiClient.post<SearchResponse>(
-    '/search',
-    { query, data_type: dataType, period },
-    { headers }
+  const response = await withRateLimitRetry(() =>
+    apiClient.post<SearchResponse>(
+      '/search',
+      {
+        query,
+        data_type: dataType,
+        period,
+        chat_session: true,
+        session_id: sessionId,
+      },
+      { headers }
+    )
   )
-  return response.data.answer
+  return response.data
 }
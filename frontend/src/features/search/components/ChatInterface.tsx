@@ -6,6 +6,7 @@ import rehypeSanitize from 'rehype-sanitize'
 import { useApiConfig } from '@/hooks/useApiConfig'
 import { useAuth } from '@/contexts/AuthContext'
 import { supabase } from '@/lib/supabase'
+import { RateLimitError } from '@/lib/apiClient'
 import { searchReceipts } from '../api/searchApi'
 import { Button } from '@/components/ui/Button'
 import { Input } from '@/components/ui/Input'
@@ -25,6 +26,7 @@ export const ChatInterface: React.FC = () => {
   const [showSuggestions, setShowSuggestions] = useState(false)
   const [dataType, setDataType] = useState('all')
   const [period, setPeriod] = useState('3months')
+  const [sessionId, setSessionId] = useState<string | null>(null)
 
   useEffect(() => {
     const fetchHistory = async () => {
@@ -89,12 +91,14 @@ export const ChatInterface: React.FC = () => {
         content: currentQuery,
       })
 
-      const answer = await searchReceipts(
+      const { answer, session_id } = await searchReceipts(
         currentQuery,
         dataType,
         period,
-        headers
+        headers,
+        sessionId
       )
+      setSessionId(session_id)
       const assistantMessage: Message = { role: 'assistant', content: answer }
 
       setMessages((prev) => [...prev, assistantMessage])
@@ -112,7 +116,10 @@ export const ChatInterface: React.FC = () => {
       console.error('Error fetching answer:', error)
       const errorMessage: Message = {
         role: 'assistant',
-        content: '申し訳ありませんが、質問の処理中にエラーが発生しました。',
+        content:
+          error instanceof RateLimitError
+            ? `ただいま混み合っています。${error.retryAfter}秒後にもう一度お試しください。`
+            : '申し訳ありませんが、質問の処理中にエラーが発生しました。',
       }
       setMessages((prev) => [...prev, errorMessage])
     } finally {
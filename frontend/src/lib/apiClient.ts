@@ -15,3 +15,45 @@ apiClient.interceptors.request.use((config) => {
   }
   return config
 })
+
+const MAX_AUTO_RETRY_WAIT_SECONDS = 10
+
+export class RateLimitError extends Error {
+  retryAfter: number
+
+  constructor(retryAfter: number) {
+    super(`Rate limited. Retry after ${retryAfter} seconds.`)
+    this.name = 'RateLimitError'
+    this.retryAfter = retryAfter
+  }
+}
+
+const getRetryAfter = (error: unknown): number | null => {
+  if (!axios.isAxiosError(error) || error.response?.status !== 429) return null
+  const seconds = Number(error.response.headers['retry-after'])
+  return Number.isFinite(seconds) && seconds > 0 ? seconds : 1
+}
+
+// 429 のとき、Retry-After が短ければ 1 回だけ待って再送し、長ければ RateLimitError を投げる
+export const withRateLimitRetry = async <T>(
+  request: () => Promise<T>
+): Promise<T> => {
+  try {
+    return await request()
+  } catch (error) {
+    const retryAfter = getRetryAfter(error)
+    if (retryAfter === null) throw error
+    if (retryAfter > MAX_AUTO_RETRY_WAIT_SECONDS) {
+      throw new RateLimitError(retryAfter)
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000))
+    try {
+      return await request()
+    } catch (retryError) {
+      const nextRetryAfter = getRetryAfter(retryError)
+      if (nextRetryAfter !== null) throw new RateLimitError(nextRetryAfter)
+      throw retryError
+    }
+  }
+}
@@ -0,0 +1,102 @@
+import { apiClient } from '@/lib/apiClient'
+
+export type SyncTable = 'receipts' | 'csv_transactions' | 'memo_rows'
+
+type SyncRow = { id: string | number } & Record<string, unknown>
+
+interface SyncResponse {
+  cursor: string
+  reset: boolean
+  upserts: Record<SyncTable, SyncRow[]>
+  deletes: Record<SyncTable, string[]>
+}
+
+export interface SyncState {
+  cursor: string | null
+  tables: Record<SyncTable, Record<string, SyncRow>>
+}
+
+const SYNC_TABLES: SyncTable[] = ['receipts', 'csv_transactions', 'memo_rows']
+const STORAGE_KEY_PREFIX = 'receipt_app_sync:'
+
+const memoryStates: Record<string, SyncState> = {}
+const pendingSyncs: Record<string, Promise<SyncState> | undefined> = {}
+
+const emptyState = (): SyncState => ({
+  cursor: null,
+  tables: { receipts: {}, csv_transactions: {}, memo_rows: {} },
+})
+
+const loadState = (userId: string): SyncState => {
+  if (memoryStates[userId]) return memoryStates[userId]
+  try {
+    const saved = localStorage.getItem(STORAGE_KEY_PREFIX + userId)
+    if (saved) return JSON.parse(saved) as SyncState
+  } catch (error) {
+    console.warn('同期キャッシュの読み込みに失敗しました:', error)
+  }
+  return emptyState()
+}
+
+const saveState = (userId: string, state: SyncState) => {
+  memoryStates[userId] = state
+  try {
+    localStorage.setItem(STORAGE_KEY_PREFIX + userId, JSON.stringify(state))
+  } catch (error) {
+    // 容量超過時はメモリ上のキャッシュだけを使い、次回起動時は全件同期になる
+    console.warn('同期キャッシュの保存に失敗しました:', error)
+    localStorage.removeItem(STORAGE_KEY_PREFIX + userId)
+  }
+}
+
+const requestSync = async (
+  userId: string,
+  headers: Record<string, string>
+): Promise<SyncState> => {
+  const state = loadState(userId)
+  const response = await apiClient.get<SyncResponse>('/sync', {
+    headers,
+    params: state.cursor ? { cursor: state.cursor } : undefined,
+  })
+  const { cursor, reset, upserts, deletes } = response.data
+
+  const next: SyncState = reset
+    ? { ...emptyState(), cursor }
+    : {
+        cursor,
+        tables: {
+          receipts: { ...state.tables.receipts },
+          csv_transactions: { ...state.tables.csv_transactions },
+          memo_rows: { ...state.tables.memo_rows },
+        },
+      }
+  for (const table of SYNC_TABLES) {
+    for (const row of upserts[table] ?? []) {
+      next.tables[table][String(row.id)] = row
+    }
+    for (const id of deletes[table] ?? []) {
+      delete next.tables[table][String(id)]
+    }
+  }
+
+  saveState(userId, next)
+  return next
+}
+
+// 前回のカーソル以降の差分だけを取得し、手元のキャッシュに反映する
+export const syncData = (
+  userId: string,
+  headers: Record<string, string>
+): Promise<SyncState> => {
+  const pending = pendingSyncs[userId]
+  if (pending) return pending
+
+  const request = requestSync(userId, headers).finally(() => {
+    delete pendingSyncs[userId]
+  })
+  pendingSyncs[userId] = request
+  return request
+}
+
+export const getSyncedRows = <T>(state: SyncState, table: SyncTable): T[] =>
+  Object.values(state.tables[table]) as unknown as T[]